@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+'''
+Count the Maya calls made by Viewport.get_state.
+
+Compares the batched get_state with the previous implementation, which
+queried every editor and camera property with its own modelEditor or
+getAttr call. Run it in an interactive Maya session with a model panel,
+for example from the script editor::
+
+    exec(open('/path/to/mvp/benchmarks/get_state_calls.py').read())
+'''
+from __future__ import print_function
+
+import time
+from collections import Counter
+
+import maya.cmds as cmds
+import maya.mel as mel
+
+from mvp import camera, capabilities, renderglobals, viewport
+from mvp.state import (
+    CAMERA_PROPERTIES, EDITOR_PROPERTIES, RENDER_GLOBALS, values_equal,
+)
+
+
+COUNTED = [
+    ('cmds', cmds, 'modelEditor'),
+    ('cmds', cmds, 'modelPanel'),
+    ('cmds', cmds, 'getAttr'),
+    ('mel', mel, 'eval'),
+    ('camera', camera, 'get_plug_value'),
+]
+
+
+def legacy_get_state(view):
+    '''get_state before the batched query, one Maya call per property.'''
+
+    state = {'RenderGlobals': dict(
+        (attr, cmds.getAttr(renderglobals.NODE + '.' + attr))
+        for attr in RENDER_GLOBALS
+    )}
+
+    for name in EDITOR_PROPERTIES:
+        try:
+            value = cmds.modelEditor(view.panel, **{'query': True, name: True})
+        except TypeError:
+            try:
+                value = cmds.modelEditor(view.panel, query=True, qpo=name)
+            except (TypeError, RuntimeError):
+                continue
+        if name == 'smallObjectThreshold':
+            value = value[0]
+        state[name] = value
+
+    for name in CAMERA_PROPERTIES:
+        value = cmds.getAttr(view.camera + '.' + name)
+        if isinstance(value, list):
+            if len(value) == 1 and isinstance(value[0], (list, tuple)):
+                value = value[0]
+        state[name] = value
+
+    return state
+
+
+def reset_caches():
+    '''Forget session caches, like the first get_state of a session. The
+    capabilities cache file is kept.'''
+
+    del capabilities._loaded[:]
+    capabilities._capabilities.clear()
+    renderglobals._cache.clear()
+    camera.clear_cache()
+    viewport._panel_cache.clear()
+    viewport._widget_cache.clear()
+
+
+def counter(counts, label, fn):
+    def counted(*args, **kwargs):
+        counts[label] += 1
+        return fn(*args, **kwargs)
+    return counted
+
+
+def count_calls(fn, *args):
+    '''Call fn counting the calls to the COUNTED functions.
+
+    :returns: Result of fn, Counter of calls and seconds spent
+    '''
+
+    counts = Counter()
+    originals = []
+    for prefix, module, name in COUNTED:
+        original = getattr(module, name)
+        originals.append((module, name, original))
+        setattr(module, name, counter(counts, prefix + '.' + name, original))
+
+    try:
+        start = time.time()
+        result = fn(*args)
+        seconds = time.time() - start
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+    return result, counts, seconds
+
+
+def report(label, counts, seconds):
+    print('%-28s %6d calls %8.1f ms  %s' % (
+        label,
+        sum(counts.values()),
+        seconds * 1000,
+        ', '.join('%s=%d' % item for item in sorted(counts.items())),
+    ))
+
+
+def main():
+    view = viewport.Viewport.active()
+
+    legacy, counts, seconds = count_calls(legacy_get_state, view)
+    report('legacy get_state', counts, seconds)
+
+    reset_caches()
+    state, counts, seconds = count_calls(view.get_state)
+    report('get_state, first call', counts, seconds)
+
+    state, counts, seconds = count_calls(view.get_state)
+    report('get_state, cached', counts, seconds)
+
+    missing = sorted(set(legacy) - set(state))
+    if missing:
+        print('Not in get_state: %s' % ', '.join(missing))
+    different = sorted(
+        key for key in set(legacy) & set(state)
+        if not values_equal(legacy[key], state[key])
+    )
+    if different:
+        print('Different values: %s' % ', '.join(different))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+Measure the import time of mvp and its submodules.
+
+Every import runs in a fresh interpreter, so each time includes the
+modules the submodule imports itself. Run it with mayapy, or any python
+with maya on its path::
+
+    mayapy benchmarks/import_time.py
+    mayapy benchmarks/import_time.py --repeat 10 mvp mvp.viewport
+'''
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+import subprocess
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'mvp',
+    'mvp.config',
+    'mvp.state',
+    'mvp.utils',
+    'mvp.camera',
+    'mvp.capabilities',
+    'mvp.renderglobals',
+    'mvp.presets',
+    'mvp.applier',
+    'mvp.hooks',
+    'mvp.viewport',
+    'mvp.extensions',
+    'mvp.integration',
+    'mvp.highlight',
+    'mvp.ui',
+]
+
+SCRIPT = '''
+import sys, time
+sys.path.insert(0, %r)
+start = time.time()
+import %s
+print(time.time() - start)
+print(' '.join(sorted(m for m in sys.modules if m.startswith('mvp'))))
+'''
+
+
+def time_import(module):
+    '''Import a module in a fresh interpreter.
+
+    :returns: Seconds spent importing and the mvp modules it imported
+    '''
+
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT % (ROOT, module)],
+    ).decode('utf-8').strip().splitlines()
+    return float(output[-2]), output[-1].split()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print('%-20s %10s %10s %8s' % ('module', 'median ms', 'min ms', 'mvp'))
+    for module in args.modules:
+        try:
+            results = [time_import(module) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError:
+            print('%-20s %10s' % (module, 'failed'))
+            continue
+
+        times = sorted(seconds for seconds, _ in results)
+        print('%-20s %10.1f %10.1f %8d' % (
+            module,
+            times[len(times) // 2] * 1000,
+            times[0] * 1000,
+            len(results[0][1]),
+        ))
+
+
+if __name__ == '__main__':
+    main()
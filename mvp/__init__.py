@@ -1,4 +1,12 @@
 # -*- coding: utf-8 -*-
+'''
+Manipulate Maya 3D Viewports.
+
+Importing mvp does not import its submodules, Qt or the ui and has no side
+effects. Names like :class:`Viewport` and :func:`playblast` import their
+module on first access. Presets paths and hooks are initialized when they
+are first used, or explicitly with :func:`init`.
+'''
 
 __title__ = 'mvp'
 __author__ = 'Dan Bradham'
@@ -8,11 +16,71 @@ __version__ = '0.9.3'
 __license__ = 'MIT'
 __description__ = 'Manipulate Maya 3D Viewports.'
 
-from .viewport import Viewport, playblast
-from .renderglobals import RenderGlobals
-from . import config, utils, presets, hooks, resources
-from .ui import show
+import sys
+import types
+import importlib
+
+
+# Lazily imported names and the modules defining them
+LAZY_ATTRIBUTES = {
+    'Viewport': 'viewport',
+    'playblast': 'viewport',
+    'RenderGlobals': 'renderglobals',
+    'ViewportState': 'state',
+    'batch_edits': 'utils',
+    'show': 'ui',
+}
+LAZY_MODULES = (
+    'applier', 'camera', 'config', 'extensions', 'hooks', 'integration',
+    'presets', 'renderglobals', 'renderlayers', 'resources', 'state', 'ui',
+    'utils', 'viewport',
+)
+
+
+def init():
+    '''Configure presets paths and discover hooks. Only runs once, later
+    calls do nothing.'''
+
+    from . import config, hooks
+    config.ensure_init()
+    hooks.ensure_init()
+
+
+def __getattr__(name):
+    if name in LAZY_ATTRIBUTES:
+        module = importlib.import_module('.' + LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    elif name in LAZY_MODULES:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError(
+            'module %r has no attribute %r' % (__name__, name)
+        )
+    setattr(sys.modules[__name__], name, value)
+    return value
+
+
+def __dir__():
+    return sorted(
+        set(vars(sys.modules[__name__]))
+        | set(LAZY_ATTRIBUTES)
+        | set(LAZY_MODULES)
+    )
+
+
+class _LazyModule(types.ModuleType):
+    '''Module calling the module level __getattr__ and __dir__.'''
+
+    def __getattr__(self, name):
+        return __getattr__(name)
+
+    def __dir__(self):
+        return __dir__()
+
 
-# Initialize and configure mvp
-config.init()
-hooks.init()
+if sys.version_info < (3, 7):  # Py2 compat, no module __getattr__
+    _module = _LazyModule(__name__, __doc__)
+    _module.__dict__.update(globals())
+    # Py2 clears the globals of modules that are garbage collected
+    _module._original = sys.modules[__name__]
+    sys.modules[__name__] = _module
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+'''
+Compile viewport states into reusable appliers.
+
+A PresetApplier turns a state dict into a MEL proc that performs all
+modelEditor and render global edits in a single evaluation. Camera
+properties are applied through :mod:`mvp.camera`. Appliers for presets are
+cached and rebuilt when the preset file changes. Viewport.set_state, and
+with it viewport_state, applies states with appliers cached by state.
+
+Procs depend on how the capabilities of the session access each property,
+so an applier compiles a new proc when those change.
+'''
+
+import sys
+
+import maya.mel as mel
+
+from . import capabilities, presets
+from .state import (
+    CAMERA_PROPERTIES, EDITOR_PROPERTIES, RENDER_GLOBALS, freeze,
+)
+from .renderglobals import NODE
+from .utils import defer_edit
+
+# Py3 compat
+if sys.version_info > (3, 0):
+    basestring = str
+
+
+# Max cached appliers of states that are not presets
+MAX_STATE_APPLIERS = 256
+
+_appliers = {}
+_state_appliers = {}
+_proc_count = [0]
+
+
+def to_mel(value):
+    '''Format a python value as a MEL flag argument.'''
+
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, basestring):
+        return '"%s"' % value.replace('\\', '\\\\').replace('"', '\\"')
+    if isinstance(value, (list, tuple)):
+        return ' '.join(to_mel(v) for v in value)
+    return repr(value)
+
+
+class PresetApplier(object):
+    '''Apply a viewport state in one MEL evaluation.
+
+    MEL procs are generated on first use because they depend on the
+    capabilities of the current Maya session. Keys that are not viewport
+    properties or RENDER_GLOBALS, like extra data stored in presets, are
+    ignored.
+
+    :param state: Viewport state dict
+    '''
+
+    def __init__(self, state):
+        self.state = state
+        self.camera = state.get('camera')
+        self.camera_state = dict(
+            (k, v) for k, v in state.items() if k in CAMERA_PROPERTIES
+        )
+        self.render_globals = dict(
+            (k, v) for k, v in (state.get('RenderGlobals') or {}).items()
+            if k in RENDER_GLOBALS
+        )
+        self.editor_state = dict(
+            (k, v) for k, v in state.items()
+            if k in EDITOR_PROPERTIES and k != 'camera'
+        )
+        self.procs = {}
+
+    def get_modes(self, panel):
+        '''Capability modes of the editor properties, procs are compiled
+        for each combination of modes.
+
+        :param panel: Name of a modelPanel used to probe capabilities
+        '''
+
+        editor_capabilities = capabilities.probe(
+            panel,
+            list(self.editor_state),
+        )
+        return tuple(sorted(
+            (name, capability.mode)
+            for name, capability in editor_capabilities.items()
+        ))
+
+    def source(self, proc, modes):
+        '''Generate the MEL proc applying editor and render global edits.
+
+        :param proc: Name of the MEL proc
+        :param modes: Capability modes, see get_modes
+        '''
+
+        modes = dict(modes)
+
+        lines = []
+        for name, value in sorted(self.editor_state.items()):
+            mode = modes[name]
+            if mode == capabilities.FLAG:
+                lines.append('modelEditor -e -%s %s $panel;' % (
+                    name, to_mel(value)
+                ))
+            elif mode == capabilities.PLUGIN_OBJECT:
+                lines.append('modelEditor -e -po "%s" %s $panel;' % (
+                    name, to_mel(value)
+                ))
+
+        for name, value in sorted(self.render_globals.items()):
+            lines.append('setAttr %s.%s %s;' % (NODE, name, to_mel(value)))
+
+        return 'global proc %s(string $panel)\n{\n    %s\n}\n' % (
+            proc,
+            '\n    '.join(lines),
+        )
+
+    def compile(self, modes):
+        '''Define the MEL proc for capability modes in this session.
+
+        :returns: Name of the MEL proc
+        '''
+
+        _proc_count[0] += 1
+        proc = 'mvpApplyPreset%d' % _proc_count[0]
+        mel.eval(self.source(proc, modes))
+        self.procs[modes] = proc
+        return proc
+
+    def apply(self, viewport):
+        '''Apply the state to a Viewport.
+
+        :param viewport: Viewport instance
+        '''
+
+        if defer_edit(self.apply, viewport):
+            return
+
+        if self.camera:
+            viewport.camera = self.camera
+
+        if self.editor_state or self.render_globals:
+            panel = viewport.panel
+            modes = self.get_modes(panel)
+            proc = self.procs.get(modes) or self.compile(modes)
+            mel.eval('%s "%s"' % (proc, panel))
+
+        if self.camera_state:
+            viewport.set_camera_state(self.camera_state)
+
+
+def get_applier(name):
+    '''Get a cached PresetApplier for a preset. The applier is rebuilt when
+    the preset changes.
+
+    :param name: Name of the preset
+    '''
+
+    version = presets.get_preset_version(name)
+
+    cached = _appliers.get(name)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    applier = PresetApplier(presets.get_preset(name))
+    _appliers[name] = (version, applier)
+    return applier
+
+
+def get_state_applier(state):
+    '''Get a cached PresetApplier for a state dict.
+
+    :param state: Viewport state dict
+    '''
+
+    key = freeze(state)
+    applier = _state_appliers.get(key)
+    if applier is None:
+        if len(_state_appliers) >= MAX_STATE_APPLIERS:
+            _state_appliers.clear()
+        applier = _state_appliers[key] = PresetApplier(state)
+    return applier
+
+
+def apply_preset(name, viewport):
+    '''Apply a preset to a Viewport using its cached PresetApplier.
+
+    :param name: Name of the preset
+    :param viewport: Viewport instance
+    '''
+
+    get_applier(name).apply(viewport)
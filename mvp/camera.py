@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+'''
+Read and write camera properties through plugs.
+
+A camera is resolved to its shape node and the plugs of all
+CAMERA_PROPERTIES once. Resolved cameras are cached until their node is
+deleted or no longer has the name it was resolved by, so switching
+between cameras does not repeat string lookups.
+'''
+from __future__ import print_function
+
+import maya.OpenMaya as OpenMaya
+
+from .state import CAMERA_PROPERTIES
+
+
+INT_TYPES = (
+    OpenMaya.MFnNumericData.kByte,
+    OpenMaya.MFnNumericData.kChar,
+    OpenMaya.MFnNumericData.kShort,
+    OpenMaya.MFnNumericData.kInt,
+)
+
+_cameras = {}
+
+
+class CameraPlugs(object):
+    '''The shape node and plugs of a camera.
+
+    :param camera: Name of a camera transform or shape
+    '''
+
+    __slots__ = ('name', 'path', 'handle', 'plugs')
+
+    def __init__(self, camera):
+        sel = OpenMaya.MSelectionList()
+        sel.add(camera)
+        dag = OpenMaya.MDagPath()
+        sel.getDagPath(0, dag)
+        self.path = OpenMaya.MDagPath(dag)
+        if dag.node().hasFn(OpenMaya.MFn.kTransform):
+            dag.extendToShape()
+
+        node = dag.node()
+        fn = OpenMaya.MFnDependencyNode(node)
+        self.name = camera
+        self.handle = OpenMaya.MObjectHandle(node)
+        self.plugs = dict(
+            (name, fn.findPlug(name)) for name in CAMERA_PROPERTIES
+        )
+
+    def is_valid(self):
+        '''True while the camera node exists and is still named like the
+        camera it was resolved from. After a rename another node may have
+        taken the name.'''
+
+        if not (self.handle.isValid() and self.handle.isAlive()):
+            return False
+        return self.name in (
+            self.path.partialPathName(),
+            self.path.fullPathName(),
+        )
+
+    def get(self, name):
+        '''Get the value of a camera property.'''
+
+        return get_plug_value(self.plugs[name])
+
+    def get_state(self):
+        '''Get a dict of all camera properties.'''
+
+        return dict(
+            (name, get_plug_value(plug)) for name, plug in self.plugs.items()
+        )
+
+    def set_state(self, state):
+        '''Set camera properties all at once. Locked and connected properties
+        are skipped.
+
+        :param state: Dict containing property, value pairs
+        '''
+
+        modifier = OpenMaya.MDGModifier()
+        for name, value in state.items():
+            plug = self.plugs.get(name)
+            if plug is None or not is_settable(plug):
+                continue
+
+            try:
+                set_plug_value(modifier, plug, value)
+            except (RuntimeError, TypeError, ValueError) as e:
+                print('Failed to set state: %s.%s %s' % (
+                    self.name, name, value
+                ))
+                print(e)
+
+        modifier.doIt()
+
+
+def get_plug_type(plug):
+    '''Returns bool, int or float depending on the plugs attribute type.'''
+
+    attr = plug.attribute()
+    if attr.hasFn(OpenMaya.MFn.kNumericAttribute):
+        unit = OpenMaya.MFnNumericAttribute(attr).unitType()
+        if unit == OpenMaya.MFnNumericData.kBoolean:
+            return bool
+        if unit in INT_TYPES:
+            return int
+    return float
+
+
+def get_plug_value(plug):
+    '''Get the value of a numeric or compound plug.'''
+
+    if plug.isCompound():
+        return tuple(
+            get_plug_value(plug.child(i)) for i in range(plug.numChildren())
+        )
+
+    typ = get_plug_type(plug)
+    if typ is bool:
+        return plug.asBool()
+    if typ is int:
+        return plug.asInt()
+    return plug.asDouble()
+
+
+def set_plug_value(modifier, plug, value):
+    '''Add a plug value change to an MDGModifier.'''
+
+    if plug.isCompound():
+        for i, child_value in enumerate(value):
+            set_plug_value(modifier, plug.child(i), child_value)
+        return
+
+    typ = get_plug_type(plug)
+    if typ is bool:
+        modifier.newPlugValueBool(plug, bool(value))
+    elif typ is int:
+        modifier.newPlugValueInt(plug, int(value))
+    else:
+        modifier.newPlugValueDouble(plug, float(value))
+
+
+def is_settable(plug):
+    '''True when a plug and its children are unlocked and not driven by a
+    connection.'''
+
+    if plug.isLocked():
+        return False
+
+    connections = OpenMaya.MPlugArray()
+    plug.connectedTo(connections, True, False)
+    if connections.length():
+        return False
+
+    if plug.isCompound():
+        for i in range(plug.numChildren()):
+            if not is_settable(plug.child(i)):
+                return False
+
+    return True
+
+
+def get_camera_plugs(camera):
+    '''Get the cached CameraPlugs of a camera, resolving it if necessary.'''
+
+    camera_plugs = _cameras.get(camera)
+    if camera_plugs is None or not camera_plugs.is_valid():
+        camera_plugs = CameraPlugs(camera)
+        _cameras[camera] = camera_plugs
+    return camera_plugs
+
+
+def get_camera_state(camera):
+    '''Get a dict of all CAMERA_PROPERTIES of a camera.
+
+    :param camera: Name of a camera transform or shape
+    '''
+
+    return get_camera_plugs(camera).get_state()
+
+
+def set_camera_state(camera, state):
+    '''Set CAMERA_PROPERTIES of a camera all at once. Locked and connected
+    properties are skipped and keys that are not camera properties are
+    ignored.
+
+    :param camera: Name of a camera transform or shape
+    :param state: Dict containing property, value pairs
+    '''
+
+    get_camera_plugs(camera).set_state(state)
+
+
+def clear_cache():
+    '''Forget all resolved cameras.'''
+
+    _cameras.clear()
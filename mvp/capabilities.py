@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+'''
+Decide once how each modelEditor property is queried and edited.
+
+Some modelEditor properties are real command flags while others, like
+gpuCacheDisplayFilter, are plugin objects that must be accessed through the
+qpo and po flags. Properties are probed once per Maya version and the result
+is stored in CACHE_PATH so later sessions skip probing entirely.
+'''
+
+import os
+import json
+from collections import namedtuple
+
+import maya.cmds as cmds
+
+from . import config
+
+
+FLAG = 'flag'
+PLUGIN_OBJECT = 'plugin_object'
+UNSUPPORTED = 'unsupported'
+
+Capability = namedtuple('Capability', ['mode', 'unwrap'])
+
+_capabilities = {}
+_loaded = []
+
+
+def get_cache_path():
+    '''Path to the capabilities cache file'''
+
+    return os.path.join(config.CACHE_PATH, 'capabilities.json')
+
+
+def get_version():
+    '''Key used to store capabilities per Maya version'''
+
+    return str(cmds.about(apiVersion=True))
+
+
+def load():
+    '''Load capabilities probed in previous sessions'''
+
+    del _loaded[:]
+    _capabilities.clear()
+    _loaded.append(True)
+
+    cache_path = get_cache_path()
+    if not os.path.isfile(cache_path):
+        return
+
+    try:
+        with open(cache_path, 'r') as f:
+            data = json.loads(f.read())
+    except (IOError, OSError, ValueError):
+        return
+
+    for name, (mode, unwrap) in data.get(get_version(), {}).items():
+        _capabilities[name] = Capability(mode, unwrap)
+
+
+def save():
+    '''Store capabilities in the cache file. Unsupported properties are only
+    kept for the session, their plugin may be loaded later.'''
+
+    cache_path = get_cache_path()
+    data = {}
+    if os.path.isfile(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                data = json.loads(f.read())
+        except (IOError, OSError, ValueError):
+            data = {}
+
+    saved = data.get(get_version(), {})
+    for name, capability in _capabilities.items():
+        if capability.mode != UNSUPPORTED:
+            saved[name] = list(capability)
+    data[get_version()] = saved
+
+    try:
+        if not os.path.exists(config.CACHE_PATH):
+            os.makedirs(config.CACHE_PATH)
+        with open(cache_path, 'w') as f:
+            f.write(json.dumps(data))
+    except (IOError, OSError):
+        pass
+
+
+def probe_property(panel, name):
+    '''Probe how a modelEditor property has to be accessed.
+
+    :param panel: Name of a modelPanel used to probe
+    :param name: Name of the property
+    :returns: Capability
+    '''
+
+    for mode, kwargs in (
+        (FLAG, {'query': True, name: True}),
+        (PLUGIN_OBJECT, {'query': True, 'qpo': name}),
+    ):
+        try:
+            value = cmds.modelEditor(panel, **kwargs)
+        except (TypeError, RuntimeError):
+            continue
+        unwrap = isinstance(value, list) and len(value) == 1
+        return Capability(mode, unwrap)
+
+    return Capability(UNSUPPORTED, False)
+
+
+def probe(panel, names):
+    '''Probe all properties in names that have not been probed yet.
+
+    :param panel: Name of a modelPanel used to probe
+    :param names: List of property names
+    :returns: Dict mapping property names to Capabilities
+    '''
+
+    if not _loaded:
+        load()
+
+    missing = [name for name in names if name not in _capabilities]
+    for name in missing:
+        _capabilities[name] = probe_property(panel, name)
+
+    if missing:
+        save()
+
+    return dict((name, _capabilities[name]) for name in names)
+
+
+def get(panel, name):
+    '''Get the Capability of a single property, probing it if necessary.
+
+    :param panel: Name of a modelPanel used to probe
+    :param name: Name of the property
+    '''
+
+    capability = _capabilities.get(name)
+    if capability is None:
+        capability = probe(panel, [name])[name]
+    return capability
+
+
+def set_unsupported(name):
+    '''Treat a property as unsupported for the rest of the session, like a
+    plugin object whose plugin is not loaded. The cache file keeps its
+    probed capability.'''
+
+    if not _loaded:
+        load()
+    _capabilities[name] = Capability(UNSUPPORTED, False)
+
+
+def clear():
+    '''Clear the session and on-disk capabilities'''
+
+    _capabilities.clear()
+    del _loaded[:]
+
+    cache_path = get_cache_path()
+    if os.path.isfile(cache_path):
+        os.remove(cache_path)
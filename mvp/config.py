@@ -5,15 +5,30 @@ Configure mvp presets and hooks
 
 import os
 import sys
+import tempfile
 
 
 USER_PRESETS_PATH = os.path.expanduser('~/.mvp')
 PRESETS_PATH = [USER_PRESETS_PATH]
+CACHE_PATH = os.path.join(USER_PRESETS_PATH, '.cache')
+STAGING_PATH = os.environ.get(
+    'MVP_STAGING_PATH',
+    os.path.join(tempfile.gettempdir(), 'mvp_staging'),
+)
+MIRROR_PRESETS = os.environ.get('MVP_MIRROR_PRESETS', '0') == '1'
+PRESET_BACKEND = os.environ.get('MVP_PRESET_BACKEND', 'json')
+
+_initialized = []
 
 
 def init():
+    _initialized[:] = [True]
+
     for path in os.environ.get('MVP_PRESETS', '').split(os.pathsep):
         if path:
+            if MIRROR_PRESETS:
+                from . import mirror
+                path = mirror.get_read_path(path)
             PRESETS_PATH.insert(0, path)
 
     for path in PRESETS_PATH:
@@ -23,3 +38,16 @@ def init():
 
         if path not in sys.path:
             sys.path.insert(1, path)
+
+
+def ensure_init():
+    '''Run init unless it ran already. Also caches whether Maya runs in
+    batch mode while on the main thread.'''
+
+    from .utils import is_batch, is_main_thread
+
+    if is_main_thread():
+        is_batch()
+
+    if not _initialized:
+        init()
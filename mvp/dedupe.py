@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+'''
+Held frame deduplication for image sequence captures.
+
+Frames with the same fingerprint as the previous frame, see
+:mod:`mvp.fingerprint`, are held frames. Only the first frame of a hold is
+captured. Held frames are hardlinks to it, so the sequence stays complete
+for encoders and integrations. Captures showing the heads up display,
+image plane sequences or other time driven inputs have no held frames.
+The manifest records which frame every held frame links to.
+'''
+from __future__ import print_function
+
+import os
+import shutil
+
+from . import fingerprint
+from .utils import frame_path, viewport_state
+
+
+def find_held_frames(fingerprints):
+    '''Map held frames to the first frame of their hold.
+
+    :param fingerprints: Dict of frame numbers and fingerprints
+    :returns: Dict of held frames and source frames
+    '''
+
+    held = {}
+    previous = None
+    for frame in sorted(fingerprints):
+        if previous is not None:
+            if fingerprints[frame] == fingerprints[previous]:
+                held[frame] = held.get(previous, previous)
+        previous = frame
+    return held
+
+
+def link_frame(src, dst):
+    '''Hardlink dst to src, copies when hardlinks are not supported.'''
+
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except (AttributeError, OSError):
+        shutil.copyfile(src, dst)
+
+
+def remove_frames(prefix, frames, padding=4):
+    '''Remove frames before capturing them again. Overwriting a hardlinked
+    frame in place would also change the frames linked to it.'''
+
+    for frame in frames:
+        path = frame_path(prefix, frame, padding)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def dedupe_playblast(filename, start, end, camera, state=None, width=960,
+                     height=540, padding=4):
+    '''Capture a png sequence, capturing held frames only once.
+
+    Arguments:
+        :param filename: Output path without frame number and extension
+        :param start: First frame
+        :param end: Last frame
+        :param camera: Camera to capture
+        :param state: Viewport state
+        :param width: Resolution width
+        :param height: Resolution height
+
+    :returns: Image sequence path like filename.####.png
+    '''
+
+    from .viewport import Viewport, playblast
+
+    start, end = int(start), int(end)
+    state = dict(state or {})
+    state['camera'] = camera
+
+    output_dir = os.path.dirname(filename)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    base = fingerprint.capture_fingerprint(
+        camera,
+        state,
+        width,
+        height,
+        start,
+    )
+    fingerprints = fingerprint.frame_fingerprints(
+        camera,
+        start,
+        end,
+        base,
+        state,
+    )
+    held = find_held_frames(fingerprints)
+    unique = [frame for frame in sorted(fingerprints) if frame not in held]
+
+    print('mvp: capturing %d of %d frames, %d held' % (
+        len(unique),
+        len(fingerprints),
+        len(held),
+    ))
+
+    remove_frames(filename, fingerprints, padding)
+    with viewport_state(Viewport.active(), state):
+        playblast(
+            state=state,
+            format='image',
+            compression='png',
+            filename=filename,
+            frame=unique,
+            width=width,
+            height=height,
+            framePadding=padding,
+        )
+
+    for frame, source in sorted(held.items()):
+        link_frame(
+            frame_path(filename, source, padding),
+            frame_path(filename, frame, padding),
+        )
+
+    manifest = {
+        'frames': dict((str(k), v) for k, v in fingerprints.items()),
+        'held': dict((str(k), v) for k, v in held.items()),
+    }
+    manifest_path = fingerprint.get_manifest_path(filename)
+    fingerprint.save_manifest(manifest_path, manifest)
+
+    return '%s.%s.png' % (filename, '#' * padding)
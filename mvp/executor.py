@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+'''
+Run postrender hooks on thread and process pools.
+
+Each postrender hook declares where it runs, how many of its calls may run
+at once and which hooks must finish before it starts. Hooks flagged
+per_frame are called once per frame of an image sequence and fanned out
+across the pool. Hooks that do not declare an executor run on Maya's
+main thread::
+
+    hooks.register_postrender(
+        'Burn-in',
+        burnin_frame,
+        executor='process',
+        concurrency=4,
+        requires=['Slate'],
+        per_frame=True,
+    )
+
+    job = executor.run_postrenders(['Slate', 'Burn-in'], filename)
+    job.wait()
+'''
+
+import os
+import threading
+import multiprocessing
+from collections import deque, OrderedDict
+from functools import partial
+
+try:
+    from concurrent import futures
+except ImportError:  # Py2 compat, requires the futures backport
+    futures = None
+
+from . import hooks
+from .utils import (
+    call_in_main_thread, expand_frames, require_futures, when_done,
+)
+
+
+THREAD = 'thread'
+PROCESS = 'process'
+MAIN = 'main'
+
+# Executor used by postrender hooks that do not declare one
+DEFAULT_EXECUTOR = MAIN
+
+# Number of workers per pool. None uses the number of cpus.
+MAX_WORKERS = None
+
+_pools = {}
+_pools_lock = threading.Lock()
+_limiters = {}
+
+
+def get_pool(kind):
+    '''Get the shared thread or process pool.'''
+
+    require_futures()
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            workers = MAX_WORKERS or multiprocessing.cpu_count()
+            if kind == PROCESS:
+                pool = futures.ProcessPoolExecutor(
+                    workers,
+                    mp_context=get_process_context(),
+                )
+            else:
+                pool = futures.ThreadPoolExecutor(workers)
+            _pools[kind] = pool
+        return pool
+
+
+def get_process_context():
+    '''Get a multiprocessing context that spawns workers with mayapy.
+
+    Forking would copy the running Maya session with its live threads, so
+    workers are always spawned. Inside Maya, sys.executable is Maya
+    itself, so workers are started with mayapy instead.
+    '''
+
+    from .parallel import get_mayapy
+
+    if not hasattr(multiprocessing, 'get_context'):
+        raise RuntimeError('The process executor requires Python 3.')
+
+    context = multiprocessing.get_context('spawn')
+    mayapy = get_mayapy()
+    if os.path.isfile(mayapy):
+        context.set_executable(mayapy)
+    return context
+
+
+def shutdown(wait=True):
+    '''Shutdown the shared pools.'''
+
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=wait)
+        _pools.clear()
+
+
+def sort_postrenders(postrenders):
+    '''Sort postrender hooks so hooks come after their requirements.
+    Requirements that are not in postrenders are ignored.'''
+
+    by_name = OrderedDict((p.name, p) for p in postrenders)
+    ordered = []
+    visiting = set()
+
+    def visit(postrender):
+        if postrender in ordered:
+            return
+        if postrender.name in visiting:
+            raise RuntimeError(
+                'Circular postrender requirements: %s' % postrender.name
+            )
+        visiting.add(postrender.name)
+        for name in postrender.requires or ():
+            if name in by_name:
+                visit(by_name[name])
+        visiting.discard(postrender.name)
+        ordered.append(postrender)
+
+    for postrender in by_name.values():
+        visit(postrender)
+    return ordered
+
+
+def _chain(source, target):
+    '''Copy the outcome of a finished future to another future.'''
+
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class Limiter(object):
+    '''Submit calls to a pool with at most limit calls running at once.
+
+    :param limit: Max running calls, None for no limit
+    '''
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.running = 0
+        self.pending = deque()
+        self.lock = threading.Lock()
+
+    def submit(self, pool, fn, *args):
+        future = futures.Future()
+        with self.lock:
+            self.pending.append((pool, fn, args, future))
+        self._next()
+        return future
+
+    def _next(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    return
+                if self.limit and self.running >= self.limit:
+                    return
+                pool, fn, args, future = self.pending.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.running += 1
+
+            try:
+                inner = pool.submit(fn, *args)
+            except Exception as e:
+                with self.lock:
+                    self.running -= 1
+                future.set_exception(e)
+                continue
+            inner.add_done_callback(partial(self._done, future))
+
+    def _done(self, future, inner):
+        with self.lock:
+            self.running -= 1
+        _chain(inner, future)
+        self._next()
+
+
+def get_limiter(postrender):
+    '''Get the Limiter shared by all calls of a postrender hook.'''
+
+    key = (postrender.name, postrender.concurrency)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters.setdefault(key, Limiter(postrender.concurrency))
+    return limiter
+
+
+def call_handler(handler, path):
+    '''Call a postrender handler. Module level so process pools can pickle
+    it.'''
+
+    return handler(path)
+
+
+class PostRenderJob(object):
+    '''Futures of the postrender hooks run for a single capture.
+
+    :param filename: Path passed to postrender handlers
+    :param callback: Called with (job, name, future) whenever a hook or
+        frame finishes
+    '''
+
+    def __init__(self, filename, callback=None):
+        self.filename = filename
+        self.callback = callback
+        self.futures = OrderedDict()
+        self.total = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<PostRenderJob %s %d/%d>' % (
+            self.filename,
+            self.completed,
+            self.total,
+        )
+
+    def progress(self):
+        '''Fraction of finished calls between 0 and 1.'''
+
+        if not self.total:
+            return 1.0
+        return self.completed / float(self.total)
+
+    def done(self):
+        return all(future.done() for future in self.futures.values())
+
+    def wait(self, timeout=None):
+        '''Wait for all hooks to finish.
+
+        :returns: Dict of hook names and exceptions of failed hooks
+        '''
+
+        futures.wait(list(self.futures.values()), timeout)
+        return self.errors()
+
+    def errors(self):
+        '''Dict of hook names and exceptions of failed hooks.'''
+
+        return dict(
+            (name, future.exception())
+            for name, future in self.futures.items()
+            if future.done()
+            and not future.cancelled()
+            and future.exception() is not None
+        )
+
+    def cancel(self):
+        '''Cancel hooks that have not started yet.'''
+
+        for future in self.futures.values():
+            future.cancel()
+
+    def _add_call(self, name, future):
+        with self._lock:
+            self.total += 1
+        future.add_done_callback(partial(self._on_call_done, name))
+
+    def _on_call_done(self, name, future):
+        with self._lock:
+            self.completed += 1
+        if self.callback:
+            self.callback(self, name, future)
+
+
+def _start(job, postrender, paths, deps, future):
+    '''Submit the calls of a postrender hook once its requirements are
+    done.'''
+
+    if not future.set_running_or_notify_cancel():
+        return
+
+    for name, dep in deps:
+        if dep.cancelled() or dep.exception() is not None:
+            future.set_exception(RuntimeError(
+                'Postrender %s requires %s which failed' % (
+                    postrender.name,
+                    name,
+                )
+            ))
+            return
+
+    executor = postrender.executor or DEFAULT_EXECUTOR
+    calls = []
+    for path in paths:
+        if executor == MAIN:
+            call = call_in_main_thread(postrender.handler, path)
+        else:
+            call = get_limiter(postrender).submit(
+                get_pool(executor),
+                call_handler,
+                postrender.handler,
+                path,
+            )
+        job._add_call(postrender.name, call)
+        calls.append(call)
+
+    def finish():
+        for call in calls:
+            if call.cancelled():
+                future.set_exception(futures.CancelledError())
+                return
+            if call.exception() is not None:
+                future.set_exception(call.exception())
+                return
+        future.set_result([call.result() for call in calls])
+
+    when_done(calls, finish)
+
+
+def run_postrenders(names, filename, sequence=None, start=None, end=None,
+                    callback=None):
+    '''Run postrender hooks without blocking.
+
+    Arguments:
+        :param names: Names of registered postrender hooks
+        :param filename: Path passed to postrender handlers
+        :param sequence: Output of the capture like name.####.png used to
+            find the frames of per_frame hooks, defaults to filename
+        :param start: First frame of the sequence
+        :param end: Last frame of the sequence
+        :param callback: Progress callback, see PostRenderJob
+
+    :returns: PostRenderJob
+    '''
+
+    require_futures()
+    hooks.ensure_init()
+    job = PostRenderJob(filename, callback)
+    postrenders = [hooks.postrender[name] for name in names]
+    frames = expand_frames(sequence or filename, start, end)
+
+    for postrender in sort_postrenders(postrenders):
+        deps = [
+            (name, job.futures[name])
+            for name in postrender.requires or ()
+            if name in job.futures
+        ]
+        future = futures.Future()
+        job.futures[postrender.name] = future
+
+        paths = frames if postrender.per_frame else [filename]
+        when_done(
+            [dep for _, dep in deps],
+            partial(_start, job, postrender, paths, deps, future),
+        )
+
+    return job
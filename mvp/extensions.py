@@ -1,6 +1,13 @@
+from __future__ import print_function
+
 import os
 from . import hooks
 from .viewport import playblast
+from .parallel import parallel_playblast
+from .streaming import streaming_playblast
+from .incremental import incremental_playblast
+from .dedupe import dedupe_playblast
+from .progressive import progressive_playblast
 
 
 def default_handler(data, options):
@@ -35,6 +42,87 @@ def default_handler(data, options):
     return playblast(**kwargs)
 
 
+def parallel_handler(data, options):
+    '''Capture a png sequence on a pool of headless workers.'''
+
+    return parallel_playblast(
+        filename=data['filename'].rsplit('.', 1)[0],
+        start=data['start_frame'],
+        end=data['end_frame'],
+        camera=data['camera'],
+        state=data['state'],
+        width=data['width'],
+        height=data['height'],
+        **options
+    )
+
+
+def streaming_handler(data, options):
+    '''Capture frames and encode them into a movie at the same time.'''
+
+    return streaming_playblast(
+        filename=data['filename'],
+        start=data['start_frame'],
+        end=data['end_frame'],
+        fps=data['fps'],
+        camera=data['camera'],
+        state=data['state'],
+        width=data['width'],
+        height=data['height'],
+        sound=data['sound'],
+        **options
+    )
+
+
+def incremental_handler(data, options):
+    '''Capture a png sequence, re-capturing only frames that changed.'''
+
+    return incremental_playblast(
+        filename=data['filename'].rsplit('.', 1)[0],
+        start=data['start_frame'],
+        end=data['end_frame'],
+        camera=data['camera'],
+        state=data['state'],
+        width=data['width'],
+        height=data['height'],
+        **options
+    )
+
+
+def dedupe_handler(data, options):
+    '''Capture a png sequence, capturing held frames only once.'''
+
+    return dedupe_playblast(
+        filename=data['filename'].rsplit('.', 1)[0],
+        start=data['start_frame'],
+        end=data['end_frame'],
+        camera=data['camera'],
+        state=data['state'],
+        width=data['width'],
+        height=data['height'],
+        **options
+    )
+
+
+def progressive_handler(data, options):
+    '''Capture a png sequence in passes of decreasing frame step.'''
+
+    def report(step, frames):
+        print('mvp: captured %d frames at step %d' % (len(frames), step))
+
+    return progressive_playblast(
+        filename=data['filename'].rsplit('.', 1)[0],
+        start=data['start_frame'],
+        end=data['end_frame'],
+        camera=data['camera'],
+        state=data['state'],
+        width=data['width'],
+        height=data['height'],
+        callback=report,
+        **options
+    )
+
+
 hooks.register_extension(
     name='h.264',
     ext='.mov',
@@ -46,3 +134,36 @@ hooks.register_extension(
     ext='.png',
     handler=default_handler,
 )
+
+hooks.register_extension(
+    name='png (parallel)',
+    ext='.png',
+    handler=parallel_handler,
+    options={'workers': None, 'retries': 2},
+)
+
+hooks.register_extension(
+    name='h.264 (streaming)',
+    ext='.mov',
+    handler=streaming_handler,
+    options={'chunk_size': 8, 'max_frames': 16},
+)
+
+hooks.register_extension(
+    name='png (incremental)',
+    ext='.png',
+    handler=incremental_handler,
+)
+
+hooks.register_extension(
+    name='png (dedupe held frames)',
+    ext='.png',
+    handler=dedupe_handler,
+)
+
+hooks.register_extension(
+    name='png (progressive)',
+    ext='.png',
+    handler=progressive_handler,
+    options={'steps': [8, 4, 2, 1]},
+)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+'''
+Fingerprint the inputs that affect captured frames.
+
+A frame fingerprint combines a capture fingerprint, covering the viewport
+state, camera, resolution and static scene, with the values of all time
+driven animation curves and the camera's world matrix at the frame. Frames
+with equal fingerprints look the same in a capture.
+
+Frames showing the frame number or inputs driven by the frame number
+itself, like the heads up display, image plane sequences, expressions and
+caches, also mix the frame number into their fingerprint. No two of
+their frames are equal.
+
+Edits that are not reflected in transforms or animation curves, like
+component edits or simulations, are not detected. Capture without the
+manifest to force a full capture after such edits.
+
+Fingerprints are stored in a json manifest next to the captured sequence.
+'''
+
+import os
+import json
+import hashlib
+
+import maya.cmds as cmds
+import maya.OpenMaya as OpenMaya
+
+from .utils import write_json
+
+
+# Anim curves driven by time, driven keys are covered by their drivers
+TIME_CURVES = ['animCurveTL', 'animCurveTA', 'animCurveTT', 'animCurveTU']
+
+# Decimals values are rounded to, avoids float noise in fingerprints
+PRECISION = 6
+
+MANIFEST_VERSION = 1
+
+# Nodes connected to time that do not make frames frame dependent, anim
+# curves are sampled by frame_fingerprints
+TIME_NODES = TIME_CURVES + ['time']
+
+
+def _round(value):
+    if isinstance(value, float):
+        return round(value, PRECISION)
+    if isinstance(value, (list, tuple)):
+        return [_round(v) for v in value]
+    return value
+
+
+def digest(*values):
+    '''Sha1 of json serializable values.'''
+
+    data = json.dumps(_round(list(values)), sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def get_anim_curves():
+    return sorted(cmds.ls(type=TIME_CURVES) or [])
+
+
+def get_world_matrices(nodes, frame):
+    '''World matrices of dag nodes at a frame as lists of 16 floats. The
+    matrices are evaluated through the API in one pass, instead of a
+    getAttr command per node.'''
+
+    context = OpenMaya.MDGContext(
+        OpenMaya.MTime(frame, OpenMaya.MTime.uiUnit())
+    )
+    sel = OpenMaya.MSelectionList()
+    for node in nodes:
+        sel.add(node)
+
+    matrices = []
+    dag = OpenMaya.MDagPath()
+    for i in range(sel.length()):
+        sel.getDagPath(i, dag)
+        plug = OpenMaya.MFnDagNode(dag).findPlug('worldMatrix')
+        plug = plug.elementByLogicalIndex(dag.instanceNumber())
+        matrix = OpenMaya.MFnMatrixData(plug.asMObject(context)).matrix()
+        matrices.append([matrix(r, c) for r in range(4) for c in range(4)])
+    return matrices
+
+
+def get_world_matrix(node, frame):
+    return get_world_matrices([node], frame)[0]
+
+
+def capture_fingerprint(camera, state, width, height, start):
+    '''Fingerprint of the inputs shared by all frames of a capture.
+
+    Arguments:
+        :param camera: Camera to capture
+        :param state: Viewport state
+        :param width: Resolution width
+        :param height: Resolution height
+        :param start: First frame, static transforms are sampled here
+    '''
+
+    if hasattr(state, 'to_dict'):
+        state = state.to_dict()
+
+    curves = get_anim_curves()
+    connections = cmds.listConnections(
+        curves,
+        source=False,
+        plugs=True,
+        connections=True,
+    ) if curves else []
+
+    transforms = sorted(cmds.ls(type='transform', long=True) or [])
+    matrices = get_world_matrices(transforms, start)
+
+    return digest(
+        state or {},
+        camera,
+        width,
+        height,
+        connections,
+        transforms,
+        matrices,
+    )
+
+
+def get_time_driven_nodes():
+    '''Nodes driven by time other than anim curves, like expressions,
+    image plane sequences and caches.'''
+
+    nodes = cmds.listConnections(
+        'time1.outTime',
+        source=False,
+        destination=True,
+    ) or []
+    return sorted(set(
+        node for node in nodes if cmds.nodeType(node) not in TIME_NODES
+    ))
+
+
+def is_frame_dependent(state):
+    '''True when captured frames show the frame number or inputs driven
+    by it. Properties missing from state count as enabled.'''
+
+    if hasattr(state, 'to_dict'):
+        state = state.to_dict()
+    state = state or {}
+
+    if state.get('headsUpDisplay', True):
+        return True
+
+    if state.get('imagePlane', True):
+        for image_plane in cmds.ls(type='imagePlane') or []:
+            if cmds.getAttr(image_plane + '.useFrameExtension'):
+                return True
+
+    return bool(get_time_driven_nodes())
+
+
+def frame_fingerprints(camera, start, end, base='', state=None):
+    '''Get the fingerprints of a frame range.
+
+    :param camera: Camera to capture
+    :param base: Capture fingerprint mixed into every frame fingerprint
+    :param state: Viewport state, the frame number is mixed into the
+        fingerprints when it is visible or drives inputs, see
+        :func:`is_frame_dependent`
+    :returns: Dict of frame numbers and fingerprints
+    '''
+
+    frame_dependent = is_frame_dependent(state)
+    curves = get_anim_curves()
+    fingerprints = {}
+    for frame in range(int(start), int(end) + 1):
+        values = []
+        if curves:
+            values = cmds.keyframe(
+                curves,
+                query=True,
+                eval=True,
+                time=(frame, frame),
+            )
+        inputs = [base, values, get_world_matrix(camera, frame)]
+        if frame_dependent:
+            inputs.append(frame)
+        fingerprints[frame] = digest(*inputs)
+    return fingerprints
+
+
+def get_manifest_path(prefix):
+    '''Manifest path of a sequence written to prefix.####.ext.'''
+
+    return prefix + '.mvp.json'
+
+
+def load_manifest(path):
+    '''Load a manifest, returns an empty manifest if it is missing or
+    invalid.'''
+
+    empty = {'version': MANIFEST_VERSION, 'frames': {}}
+    if not os.path.isfile(path):
+        return empty
+
+    try:
+        with open(path, 'r') as f:
+            manifest = json.loads(f.read())
+    except (IOError, OSError, ValueError):
+        return empty
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return empty
+    return manifest
+
+
+def save_manifest(path, manifest):
+    manifest['version'] = MANIFEST_VERSION
+    write_json(path, manifest)
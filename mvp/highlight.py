@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from Qt import QtGui, QtCore, QtWidgets
+
+from .utils import get_maya_window
+
+
+class Highlight(QtWidgets.QDialog):
+    '''Outline a viewport panel and show the panel name.'''
+
+    def __init__(self, view):
+        super(Highlight, self).__init__(parent=get_maya_window())
+        self.view = view
+        self.widget = self.view.widget
+
+        self.setWindowFlags(
+            self.windowFlags()
+            | QtCore.Qt.FramelessWindowHint
+        )
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        wrect = self.widget.geometry()
+        rect = QtCore.QRect(
+            self.widget.mapToGlobal(
+                wrect.topLeft(),
+            ),
+            wrect.size(),
+        )
+        self.setGeometry(
+            rect
+        )
+
+    def display(self, msec):
+        w = QtWidgets.QApplication.instance().activeWindow()
+        self.show()
+        w.raise_()
+        QtCore.QTimer.singleShot(msec, self.accept)
+
+    def paintEvent(self, event):
+
+        painter = QtGui.QPainter(self)
+
+        pen = QtGui.QPen(QtCore.Qt.red)
+        pen.setWidth(8)
+        font = QtGui.QFont()
+        font.setPointSize(48)
+        painter.setFont(font)
+        painter.setPen(pen)
+        painter.setBrush(QtCore.Qt.transparent)
+
+        painter.drawRect(self.rect())
+        painter.drawText(self.rect(), QtCore.Qt.AlignCenter, self.view.panel)
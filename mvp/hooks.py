@@ -1,29 +1,135 @@
 # -*- coding: utf-8 -*-
+'''
+Hook registries and discovery.
+
+Hooks are registered by python modules and packages on the presets paths
+and by :mod:`mvp.extensions`. init records which hooks each module
+registers in a manifest in the cache. While a module's files are
+unchanged, its hooks are listed from the manifest and the module is only
+imported when one of its hooks is first accessed.
+'''
+from __future__ import print_function
 
 import os
-import glob
+import sys
+import json
+import traceback
+import importlib
 from collections import OrderedDict, namedtuple
 from . import config
 
+try:
+    from importlib import reload
+except ImportError:  # Py2 compat
+    pass
+
+
+MANIFEST_VERSION = 1
+BUILTIN_MODULES = ['mvp.extensions']
+
+_recording = []
+_initialized = []
+
+
+class Registry(OrderedDict):
+    '''An OrderedDict of hooks. Listing names does not import anything,
+    accessing a hook imports the module registering it when needed.'''
+
+    def __init__(self, *args, **kwargs):
+        self.lazy = {}
+        super(Registry, self).__init__(*args, **kwargs)
+
+    def add_lazy(self, name, module):
+        '''Add a hook registered by a module that is not imported yet.'''
+
+        if name not in self:
+            OrderedDict.__setitem__(self, name, None)
+            self.lazy[name] = module
+
+    def __setitem__(self, key, value):
+        self.lazy.pop(key, None)
+        OrderedDict.__setitem__(self, key, value)
+
+    def __getitem__(self, key):
+        if key in self.lazy:
+            import_module(self.lazy[key])
+            if key in self.lazy:
+                # The module no longer registers this hook
+                self.pop(key)
+                invalidate()
+        return OrderedDict.__getitem__(self, key)
+
+    def __delitem__(self, key):
+        self.lazy.pop(key, None)
+        OrderedDict.__delitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        self.lazy.pop(key, None)
+        return OrderedDict.pop(self, key, *default)
+
+    def clear(self):
+        self.lazy.clear()
+        OrderedDict.clear(self)
+
+    def values(self):
+        return [self[key] for key in list(self)]
 
-postrender = OrderedDict()
-pathgen = OrderedDict()
-integration = OrderedDict()
-extension = OrderedDict()
+    def items(self):
+        return [(key, self[key]) for key in list(self)]
+
+
+postrender = Registry()
+pathgen = Registry()
+integration = Registry()
+extension = Registry()
+
+REGISTRIES = OrderedDict([
+    ('postrender', postrender),
+    ('pathgen', pathgen),
+    ('integration', integration),
+    ('extension', extension),
+])
 
 PathGenerator = namedtuple('PathGenerator', ['name', 'handler'])
-PostRender = namedtuple('PostRender', ['name', 'handler', 'default'])
+PostRender = namedtuple(
+    'PostRender',
+    ['name', 'handler', 'default', 'executor', 'concurrency', 'requires',
+     'per_frame'],
+)
 Extension = namedtuple('Extension', ['name', 'ext', 'handler', 'options'])
 
 
-def register_postrender(name, handler, default=None):
+def register_postrender(name, handler, default=None, executor=None,
+                        concurrency=None, requires=None, per_frame=False):
     '''Add postrender function to registry
 
     :param name: Name of postrender function (used as label in ui)
     :param handler: Postrender function
+    :param executor: Where the handler runs, 'thread', 'process' or 'main'
+        for Maya's main thread. Defaults to executor.DEFAULT_EXECUTOR,
+        'main'. Only handlers that do not call Maya may run on a pool.
+        Process handlers must be importable module level functions.
+    :param concurrency: Max number of calls of this handler running at once
+    :param requires: Names of postrender hooks that must finish first
+    :param per_frame: Call the handler once per frame of image sequences
     '''
 
-    postrender[name] = PostRender(name, handler, default)
+    _record('postrender', name)
+    postrender[name] = PostRender(
+        name,
+        handler,
+        default,
+        executor,
+        concurrency,
+        tuple(requires or ()),
+        per_frame,
+    )
 
 
 def unregister_postrender(name):
@@ -39,6 +145,7 @@ def register_path(name, handler):
     :param handler: Path generator function
     '''
 
+    _record('pathgen', name)
     pathgen[name] = PathGenerator(name, handler)
 
 
@@ -58,6 +165,7 @@ def register_integration(name, obj):
     :param obj: Integration obj
     '''
 
+    _record('integration', name)
     integration[name] = obj
 
 
@@ -78,6 +186,7 @@ def register_extension(name, ext, handler, options=None):
     :param handler: Handler function that performs the playblasting
     '''
 
+    _record('extension', name)
     extension[name] = Extension(name, ext, handler, options)
 
 
@@ -90,27 +199,163 @@ def unregister_extension(name):
     extension.pop(name, None)
 
 
-def init():
-    '''Discover presets'''
+def _record(registry, name):
+    if _recording:
+        _recording[-1].append([registry, name])
 
-    postrender.clear()
-    pathgen.clear()
-    integration.clear()
-    extension.clear()
 
-    # Find registered presets in MVP_PRESETS path
-    for path in config.PRESETS_PATH:
+def import_module(name):
+    '''Import or reload a hook module.
+
+    :returns: List of [registry, name] pairs the module registered or
+        None when the import failed
+    '''
+
+    _recording.append([])
+    try:
+        if name in sys.modules:
+            reload(sys.modules[name])
+        else:
+            importlib.import_module(name)
+    except Exception:
+        print('mvp: failed to import hooks from %s' % name)
+        traceback.print_exc()
+        _recording.pop()
+        return None
+    return _recording.pop()
+
 
-        # Import all python files on MVP_PRESETS path
-        for f in glob.glob(os.path.join(path, '*.py')):
-            base = os.path.basename(f)
-            name = os.path.splitext(base)[0]
-            __import__(name)
+def get_mtime(path):
+    '''Latest mtime of a module or of the python files in a package.'''
 
-        # Import all packages on MVP_PRESETS path
-        for f in glob.glob(os.path.join(path, '*', '__init__.py')):
-            name = os.path.basename(os.path.dirname(f))
-            __import__(name)
+    if os.path.basename(path) != '__init__.py':
+        return os.path.getmtime(path)
+
+    mtime = 0
+    for root, dirs, files in os.walk(os.path.dirname(path)):
+        for f in files:
+            if f.endswith('.py'):
+                mtime = max(mtime, os.path.getmtime(os.path.join(root, f)))
+    return mtime
+
+
+def find_modules():
+    '''Find hook modules on the presets paths and the builtin modules.
+
+    :returns: List of (module name, path) tuples
+    '''
+
+    modules = []
+    for path in config.PRESETS_PATH:
+        try:
+            names = sorted(os.listdir(path))
+        except OSError:
+            continue
+
+        # Python files and packages on MVP_PRESETS path
+        for f in names:
+            full_path = os.path.join(path, f)
+            if f.endswith('.py'):
+                modules.append((os.path.splitext(f)[0], full_path))
+            elif os.path.isfile(os.path.join(full_path, '__init__.py')):
+                modules.append((f, os.path.join(full_path, '__init__.py')))
+
+    # Builtin extensions
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in BUILTIN_MODULES:
+        module_path = name.split('.', 1)[1].replace('.', os.sep) + '.py'
+        modules.append((name, os.path.join(package_dir, module_path)))
+    return modules
+
+
+def get_manifest_path():
+    return os.path.join(config.CACHE_PATH, 'hooks.json')
+
+
+def load_manifest():
+    try:
+        with open(get_manifest_path(), 'r') as f:
+            manifest = json.loads(f.read())
+    except (IOError, OSError, ValueError):
+        return {}
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('modules', {})
+
+
+def save_manifest(modules):
+    path = get_manifest_path()
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(json.dumps(
+                {'version': MANIFEST_VERSION, 'modules': modules},
+                indent=4,
+                sort_keys=True,
+            ))
+    except (IOError, OSError) as e:
+        print('mvp: failed to save the hooks manifest: %s' % e)
+
+
+def invalidate():
+    '''Remove the cached manifest, the next init imports all modules.'''
+
+    try:
+        os.remove(get_manifest_path())
+    except OSError:
+        pass
+
+
+def init(clear=True):
+    '''Discover hooks. Modules that changed since the manifest was cached
+    are imported, others are imported when their hooks are first
+    accessed.
+
+    :param clear: Remove registered hooks first
+    '''
 
-    # Import builtin extensions
-    from . import extensions
+    _initialized[:] = [True]
+    config.ensure_init()
+
+    if clear:
+        for registry in REGISTRIES.values():
+            registry.clear()
+
+    cached = load_manifest()
+    modules = {}
+    changed = False
+    for name, path in find_modules():
+        try:
+            mtime = get_mtime(path)
+        except OSError:
+            continue
+
+        entry = cached.get(name)
+        if entry and entry['path'] == path and entry['mtime'] == mtime:
+            for registry, hook in entry['hooks']:
+                REGISTRIES[registry].add_lazy(hook, name)
+        else:
+            changed = True
+            registered = import_module(name)
+            if registered is None:
+                # Not cached, so the import is retried on the next init
+                continue
+            entry = {'path': path, 'mtime': mtime, 'hooks': registered}
+        modules[name] = entry
+
+    if changed or set(modules) != set(cached):
+        save_manifest(modules)
+
+    # Resume background jobs of the previous session
+    from . import jobs
+    jobs.resume()
+
+
+def ensure_init():
+    '''Discover hooks unless init ran already. Keeps hooks registered
+    before the first use of mvp.'''
+
+    if not _initialized:
+        init(clear=False)
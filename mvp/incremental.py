@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+'''
+Incremental image sequence capture.
+
+A manifest next to the sequence stores the fingerprint of every captured
+frame, see :mod:`mvp.fingerprint`. The next capture only re-captures
+frames whose fingerprint changed or whose image is missing, and reuses
+the rest.
+
+Captures staged on a local disk start without the previous frames and
+capture every frame. Their manifest is transferred with the frames, see
+:mod:`mvp.staging`.
+'''
+from __future__ import print_function
+
+import os
+
+from . import fingerprint
+from .dedupe import remove_frames
+from .utils import frame_path, viewport_state
+
+
+def group_frames(frames):
+    '''Group frames into contiguous (start, end) ranges.'''
+
+    ranges = []
+    for frame in sorted(frames):
+        if ranges and ranges[-1][1] == frame - 1:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return [tuple(r) for r in ranges]
+
+
+def get_dirty_frames(prefix, fingerprints, manifest, padding=4):
+    '''Frames whose fingerprint changed or whose image is missing.'''
+
+    captured = manifest.get('frames', {})
+    return [
+        frame for frame, value in sorted(fingerprints.items())
+        if captured.get(str(frame)) != value
+        or not os.path.isfile(frame_path(prefix, frame, padding))
+    ]
+
+
+def incremental_playblast(filename, start, end, camera, state=None,
+                          width=960, height=540, padding=4, force=False):
+    '''Capture a png sequence, re-capturing only frames that changed since
+    the last capture.
+
+    Arguments:
+        :param filename: Output path without frame number and extension
+        :param start: First frame
+        :param end: Last frame
+        :param camera: Camera to capture
+        :param state: Viewport state
+        :param width: Resolution width
+        :param height: Resolution height
+        :param force: Capture all frames
+
+    :returns: Image sequence path like filename.####.png
+    '''
+
+    from .viewport import Viewport, playblast
+
+    start, end = int(start), int(end)
+    state = dict(state or {})
+    state['camera'] = camera
+
+    output_dir = os.path.dirname(filename)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    manifest_path = fingerprint.get_manifest_path(filename)
+    manifest = {} if force else fingerprint.load_manifest(manifest_path)
+
+    base = fingerprint.capture_fingerprint(
+        camera,
+        state,
+        width,
+        height,
+        start,
+    )
+    fingerprints = fingerprint.frame_fingerprints(
+        camera,
+        start,
+        end,
+        base,
+        state,
+    )
+    dirty = get_dirty_frames(filename, fingerprints, manifest, padding)
+
+    print('mvp: capturing %d of %d frames' % (len(dirty), len(fingerprints)))
+
+    frames = dict(manifest.get('frames', {}))
+    held = dict(manifest.get('held', {}))
+    with viewport_state(Viewport.active(), state):
+        for range_start, range_end in group_frames(dirty):
+            recaptured = range(range_start, range_end + 1)
+            remove_frames(filename, recaptured, padding)
+            playblast(
+                state=state,
+                format='image',
+                compression='png',
+                filename=filename,
+                startTime=range_start,
+                endTime=range_end,
+                width=width,
+                height=height,
+                framePadding=padding,
+            )
+            # Save after every range so an interrupted capture keeps its
+            # finished frames
+            for frame in recaptured:
+                frames[str(frame)] = fingerprints[frame]
+                held.pop(str(frame), None)
+            held = dict(
+                (k, v) for k, v in held.items() if v not in recaptured
+            )
+            manifest['frames'] = frames
+            manifest['held'] = held
+            fingerprint.save_manifest(manifest_path, manifest)
+
+    return '%s.%s.png' % (filename, '#' * padding)
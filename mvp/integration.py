@@ -11,6 +11,12 @@ class Integration(object):
     enabled_by_default = False
     columns = 1
 
+    # Lifecycle methods run as background jobs, like ['finalize']. These
+    # receive the form values as a dict instead of the form.
+    background = []
+    retries = 3
+    concurrency = 1
+
     def __init__(self):
         self.set_enabled(self.enabled_by_default)
 
@@ -84,3 +90,41 @@ class Integration(object):
         '''
 
         return NotImplemented
+
+    def submit(self, method, *args, **kwargs):
+        '''Run a method of this integration as a persistent background job.
+
+        The job survives a restart of Maya, so all arguments must be json
+        serializable. The method runs off Maya's main thread.
+
+        :param method: Name of the method to run
+        :returns: mvp.jobs.Job, use job.future to wait for the result
+        '''
+
+        from . import hooks, jobs
+
+        hooks.ensure_init()
+        for name, obj in hooks.integration.items():
+            if isinstance(self, obj):
+                break
+        else:
+            raise RuntimeError('%s is not a registered integration.' % self)
+
+        return jobs.get_queue().submit(
+            'integration:%s.%s' % (name, method),
+            args=args,
+            kwargs=kwargs,
+            group=name,
+            retries=self.retries,
+        )
+
+    def run(self, method, form, data):
+        '''Run a lifecycle method, as a background job when it is listed in
+        background.
+
+        :returns: The result of the method or a Future
+        '''
+
+        if method in self.background:
+            return self.submit(method, form.get_value(), data).future
+        return getattr(self, method)(form, data)
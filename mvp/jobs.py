@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+'''
+Persistent background job queue.
+
+Jobs are stored as json files so pending work like uploads survives a
+restart of Maya. Each job calls a target with json serializable arguments
+on a worker thread. Failed jobs are retried with a growing delay, and jobs
+in the same group respect the group's concurrency limit.
+
+Targets are referenced by name so they can be resolved again after a
+restart. A target is either 'package.module:function' or
+'integration:<name>.<method>' for a method of a registered Integration::
+
+    job = jobs.get_queue().submit(
+        'mvp.jobs:upload',
+        args=[filename, 'http://localhost:8000/uploads/'],
+        retries=5,
+    )
+    job.future.add_done_callback(on_uploaded)
+
+Targets run off Maya's main thread. Use utils.call_in_main_thread to call
+maya.cmds from a target.
+
+Several Maya sessions share the jobs directory. Job files are named after
+the session owning them, and each session touches a heartbeat file while
+its queue runs. Jobs of sessions without a recent heartbeat are adopted
+by renaming their files, so only one session runs them.
+'''
+from __future__ import print_function
+
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+import traceback
+
+try:
+    from concurrent import futures
+except ImportError:  # Py2 compat, requires the futures backport
+    futures = None
+
+from . import config, hooks
+from .utils import (
+    call_in_main_thread, is_batch, require_futures, write_json,
+)
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Seconds to wait before retrying a job, multiplied by its attempts
+RETRY_DELAY = 10
+
+# Max running jobs of a queue and of each group
+CONCURRENCY = 2
+GROUP_CONCURRENCY = {}
+
+# Seconds between heartbeats of a running queue, and after which a session
+# without a heartbeat is considered dead and its jobs are adopted
+HEARTBEAT = 15
+OWNER_TIMEOUT = 120
+
+_queue = []
+
+
+def get_jobs_path():
+    return os.path.join(config.CACHE_PATH, 'jobs')
+
+
+def get_owner_path(path, owner):
+    return os.path.join(path, 'owners', owner)
+
+
+def parse_job_name(name):
+    '''Get the job id and owner of a job file name like <id>.<owner>.json.
+
+    :returns: (id, owner) tuple, owner is None for files without an owner,
+        or None when name is not a job file
+    '''
+
+    if not name.endswith('.json'):
+        return None
+    parts = name[:-len('.json')].split('.')
+    if len(parts) == 1:
+        return parts[0], None
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    return None
+
+
+def is_alive(path, owner):
+    '''True when the session owning jobs touched its heartbeat recently.'''
+
+    if owner is None:
+        return False
+    try:
+        mtime = os.path.getmtime(get_owner_path(path, owner))
+    except OSError:
+        return False
+    return time.time() - mtime < OWNER_TIMEOUT
+
+
+def resolve(target):
+    '''Resolve a target name to a callable.
+
+    :param target: 'package.module:function' or
+        'integration:<name>.<method>'
+    '''
+
+    kind, _, name = target.partition(':')
+    if kind == 'integration':
+        integration_name, method = name.rsplit('.', 1)
+        return getattr(get_integration(integration_name), method)
+
+    obj = __import__(kind, fromlist=['__name__'])
+    for attr in name.split('.'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+_integrations = {}
+
+
+def _create_integration(name):
+    if name not in _integrations:
+        hooks.ensure_init()
+        if name not in hooks.integration:
+            raise RuntimeError('Integration %s is not registered.' % name)
+        _integrations[name] = hooks.integration[name]()
+    return _integrations[name]
+
+
+def get_integration(name):
+    '''Get an instance of a registered Integration for background jobs.
+
+    Instances are created on Maya's main thread, because enabling an
+    integration commonly calls Maya or creates ui.
+    '''
+
+    if name in _integrations:
+        return _integrations[name]
+    return call_in_main_thread(_create_integration, name).result()
+
+
+class Job(object):
+    '''A persisted call of a target.
+
+    :param data: Job dict as stored on disk
+    '''
+
+    def __init__(self, data):
+        self.data = data
+        self.future = futures.Future()
+
+    def __repr__(self):
+        return '<Job %s %s %s>' % (self.id, self.target, self.state)
+
+    def __getattr__(self, attr):
+        try:
+            return self.__dict__['data'][attr]
+        except KeyError:
+            raise AttributeError(attr)
+
+    @classmethod
+    def new(cls, target, args=None, kwargs=None, group=None, retries=3,
+            group_limit=None):
+        now = time.time()
+        return cls(dict(
+            id=uuid.uuid4().hex,
+            target=target,
+            args=list(args or []),
+            kwargs=dict(kwargs or {}),
+            group=group or target,
+            group_limit=group_limit,
+            retries=retries,
+            attempts=0,
+            state=PENDING,
+            error=None,
+            created=now,
+            updated=now,
+            not_before=0,
+        ))
+
+
+class JobQueue(object):
+    '''Run persisted jobs on worker threads.
+
+    :param path: Directory storing job files
+    :param concurrency: Max number of running jobs
+    :param group_concurrency: Dict of max running jobs per group
+    '''
+
+    def __init__(self, path, concurrency=None, group_concurrency=None):
+        self.path = path
+        self.concurrency = concurrency or CONCURRENCY
+        self.group_concurrency = dict(GROUP_CONCURRENCY)
+        self.group_concurrency.update(group_concurrency or {})
+        self.owner = uuid.uuid4().hex
+        self._jobs = {}
+        self._running = {}
+        self._threads = []
+        self._beat_thread = None
+        self._stopped = False
+        self._cond = threading.Condition()
+
+    def job_path(self, job):
+        return os.path.join(self.path, '%s.%s.json' % (job.id, self.owner))
+
+    def save(self, job):
+        job.data['updated'] = time.time()
+        write_json(self.job_path(job), job.data)
+
+    def heartbeat(self):
+        '''Tell other sessions this queue is alive.'''
+
+        path = get_owner_path(self.path, self.owner)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(str(os.getpid()))
+
+    def load(self):
+        '''Adopt the jobs of sessions that are no longer alive. Jobs that
+        were running in those sessions are pending again.'''
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        for name in os.listdir(self.path):
+            parsed = parse_job_name(name)
+            if not parsed:
+                continue
+            job_id, owner = parsed
+            if owner == self.owner or is_alive(self.path, owner):
+                continue
+
+            # Renaming is atomic, only one session adopts a job
+            path = os.path.join(self.path, '%s.%s.json' % (job_id, self.owner))
+            try:
+                os.rename(os.path.join(self.path, name), path)
+            except OSError:
+                continue
+
+            try:
+                with open(path, 'r') as f:
+                    job = Job(json.loads(f.read()))
+            except (IOError, OSError, ValueError) as e:
+                print('mvp: failed to load job %s: %s' % (name, e))
+                continue
+
+            with self._cond:
+                if job.id in self._jobs:
+                    continue
+                if job.state == RUNNING:
+                    job.data['state'] = PENDING
+                    self.save(job)
+                self._jobs[job.id] = job
+                self._cond.notify_all()
+
+    def start(self):
+        '''Adopt persisted jobs and start the worker threads.'''
+
+        self.heartbeat()
+        self.load()
+        with self._cond:
+            self._stopped = False
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if not self._beat_thread or not self._beat_thread.is_alive():
+                self._beat_thread = threading.Thread(target=self._beat)
+                self._beat_thread.daemon = True
+                self._beat_thread.start()
+            while len(self._threads) < self.concurrency:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+            self._cond.notify_all()
+
+    def stop(self, wait=True):
+        '''Stop the workers after their current jobs. Once stopped, other
+        sessions adopt the jobs that are left.'''
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads + [self._beat_thread]:
+                if thread:
+                    thread.join()
+            try:
+                os.remove(get_owner_path(self.path, self.owner))
+            except OSError:
+                pass
+
+    def _beat(self):
+        '''Touch the heartbeat and adopt jobs of dead sessions.'''
+
+        while True:
+            with self._cond:
+                self._cond.wait(HEARTBEAT)
+                if self._stopped:
+                    return
+            try:
+                self.heartbeat()
+                self.load()
+            except (IOError, OSError) as e:
+                print('mvp: job queue heartbeat failed: %s' % e)
+
+    def submit(self, target, args=None, kwargs=None, group=None,
+               retries=3):
+        '''Add a job to the queue.
+
+        Arguments:
+            :param target: Target name, see resolve
+            :param args: Json serializable positional arguments
+            :param kwargs: Json serializable keyword arguments
+            :param group: Jobs in a group share a concurrency limit,
+                defaults to the target
+            :param retries: How often a failed job is retried
+
+        :returns: Job
+        '''
+
+        group = group or target
+        limit = call_in_main_thread(self.get_group_limit, group).result()
+        job = Job.new(target, args, kwargs, group, retries, limit)
+        with self._cond:
+            self.save(job)
+            self._jobs[job.id] = job
+            self._cond.notify_all()
+        return job
+
+    def jobs(self, state=None):
+        '''List jobs, optionally only jobs in a state.'''
+
+        with self._cond:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created)
+        return [job for job in jobs if state is None or job.state == state]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        '''Cancel a pending job.'''
+
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state != PENDING:
+                return False
+            job.data['state'] = CANCELLED
+            self.save(job)
+        job.future.cancel()
+        return True
+
+    def retry(self, job_id):
+        '''Queue a failed or cancelled job again.'''
+
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state not in (FAILED, CANCELLED):
+                return False
+            job.data.update(state=PENDING, attempts=0, not_before=0)
+            job.future = futures.Future()
+            self.save(job)
+            self._cond.notify_all()
+        return True
+
+    def clear(self):
+        '''Remove finished jobs from the queue and disk.'''
+
+        with self._cond:
+            for job in list(self._jobs.values()):
+                if job.state in (DONE, CANCELLED):
+                    os.remove(self.job_path(job))
+                    self._jobs.pop(job.id)
+
+    def get_group_limit(self, group):
+        '''Max running jobs of a group. Groups named after an Integration
+        default to its concurrency. Hooks may be imported, so call it on
+        the main thread. Limits are stored with jobs when submitted.'''
+
+        if group in self.group_concurrency:
+            return self.group_concurrency[group]
+        hooks.ensure_init()
+        return getattr(hooks.integration.get(group), 'concurrency', None)
+
+    def _next_job(self):
+        '''Get the next runnable job and the seconds to wait for one.'''
+
+        now = time.time()
+        wait = None
+        for job in sorted(self._jobs.values(), key=lambda job: job.created):
+            if job.state != PENDING:
+                continue
+
+            limit = self.group_concurrency.get(
+                job.group,
+                job.data.get('group_limit'),
+            )
+            if limit and self._running.get(job.group, 0) >= limit:
+                continue
+
+            if job.not_before > now:
+                delay = job.not_before - now
+                wait = delay if wait is None else min(wait, delay)
+                continue
+
+            return job, None
+        return None, wait
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    job, wait = self._next_job()
+                    if job:
+                        break
+                    self._cond.wait(wait)
+
+                job.data['state'] = RUNNING
+                job.data['attempts'] += 1
+                self._running[job.group] = self._running.get(job.group, 0) + 1
+                self.save(job)
+
+            self._run(job)
+
+    def _run(self, job):
+        result = error = None
+        try:
+            result = resolve(job.target)(*job.args, **job.kwargs)
+        except Exception as e:
+            error = e
+            job.data['error'] = traceback.format_exc()
+
+        with self._cond:
+            self._running[job.group] -= 1
+
+            if error is None:
+                job.data.update(state=DONE, error=None)
+            elif job.attempts <= job.retries:
+                job.data.update(
+                    state=PENDING,
+                    not_before=time.time() + RETRY_DELAY * job.attempts,
+                )
+            else:
+                job.data['state'] = FAILED
+                print('mvp: job %s failed: %s' % (job.target, error))
+
+            self.save(job)
+            self._cond.notify_all()
+
+        if job.state == DONE:
+            job.future.set_result(result)
+        elif job.state == FAILED:
+            job.future.set_exception(error)
+
+
+def get_queue():
+    '''Get the shared job queue, started on first use.'''
+
+    if not _queue:
+        require_futures()
+        _queue.append(JobQueue(get_jobs_path()))
+        _queue[0].start()
+    return _queue[0]
+
+
+def resume():
+    '''Start the shared job queue when jobs of a session that is no longer
+    alive are pending. Batch sessions, like farm and parallel workers, do
+    not resume jobs.'''
+
+    path = get_jobs_path()
+    if _queue or is_batch() or not os.path.isdir(path):
+        return
+
+    for name in os.listdir(path):
+        parsed = parse_job_name(name)
+        if not parsed or is_alive(path, parsed[1]):
+            continue
+        try:
+            with open(os.path.join(path, name), 'r') as f:
+                state = json.loads(f.read()).get('state')
+        except (IOError, OSError, ValueError):
+            continue
+        if state in (PENDING, RUNNING):
+            get_queue()
+            return
+
+
+def upload(filename, url, timeout=60):
+    '''Upload a file to a directory url. Supports file:// urls and http(s)
+    PUT requests.
+
+    :param filename: File to upload
+    :param url: Destination directory url
+    :returns: Url of the uploaded file
+    '''
+
+    name = os.path.basename(filename)
+    dst = url.rstrip('/') + '/' + name
+
+    if url.startswith('file://'):
+        dst_path = dst[len('file://'):]
+        dst_dir = os.path.dirname(dst_path)
+        if not os.path.isdir(dst_dir):
+            os.makedirs(dst_dir)
+        shutil.copyfile(filename, dst_path)
+        return dst
+
+    try:
+        from urllib.request import Request, urlopen
+        from urllib.parse import quote
+    except ImportError:  # Py2 compat
+        from urllib2 import Request, urlopen
+        from urllib import quote
+
+    dst = url.rstrip('/') + '/' + quote(name)
+    with open(filename, 'rb') as f:
+        request = Request(dst, data=f)
+        request.get_method = lambda: 'PUT'
+        request.add_header('Content-Length', str(os.path.getsize(filename)))
+        request.add_header('Content-Type', 'application/octet-stream')
+        response = urlopen(request, timeout=timeout)
+        response.read()
+        response.close()
+    return dst
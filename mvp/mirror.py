@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+'''
+Local mirrors of remote presets paths.
+
+Presets and hooks on a file server are read on every dialog open and when
+mvp is imported. With MVP_MIRROR_PRESETS=1, every MVP_PRESETS path is
+mirrored to the local cache. Once a mirror exists it is used in place of
+the remote path and synced in the background. When the remote path is
+slow or unreachable, the last synced mirror keeps working.
+
+Syncing compares a manifest of size, mtime and sha1 per file. Remote
+paths can publish a manifest with :func:`write_manifest`, which saves
+walking the remote directory. Otherwise the remote directory is walked
+and files are hashed while they are copied.
+'''
+from __future__ import print_function
+
+import os
+import json
+import hashlib
+import threading
+
+from . import config
+from .staging import checksum, copy_file
+from .utils import write_json
+
+
+MANIFEST_NAME = 'mvp_manifest.json'
+LOCAL_MANIFEST_NAME = '.mvp_mirror.json'
+IGNORE_DIRS = ('__pycache__', '.cache', '.git')
+IGNORE_EXTS = ('.pyc', '.pyo', '.part', '.tmp')
+
+# Mirror paths and the remote paths they mirror
+mirrors = {}
+_syncs = {}
+
+
+def get_mirror_path(remote):
+    '''Local mirror path of a remote path.'''
+
+    key = hashlib.md5(os.path.abspath(remote).encode('utf-8')).hexdigest()
+    return os.path.join(config.CACHE_PATH, 'mirror', key[:12])
+
+
+def get_remote_path(path):
+    '''Remote path of a mirror path, or path when it is not a mirror.'''
+
+    return mirrors.get(path, path)
+
+
+def is_synced(mirror):
+    return os.path.isfile(os.path.join(mirror, LOCAL_MANIFEST_NAME))
+
+
+def scan(root):
+    '''Build a manifest of a directory without hashing files.
+
+    :returns: Dict of relative paths and dicts of size and mtime
+    '''
+
+    if not os.path.isdir(root):
+        raise IOError('Presets path is unreachable: %s' % root)
+
+    def onerror(error):
+        raise error
+
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(root, onerror=onerror):
+        dirnames[:] = [
+            d for d in dirnames
+            if d not in IGNORE_DIRS and not d.startswith('.')
+        ]
+        for filename in filenames:
+            if filename.endswith(IGNORE_EXTS) or filename.startswith('.'):
+                continue
+            if filename == MANIFEST_NAME:
+                continue
+            path = os.path.join(dirpath, filename)
+            st = os.stat(path)
+            relpath = os.path.relpath(path, root).replace(os.sep, '/')
+            manifest[relpath] = {'size': st.st_size, 'mtime': st.st_mtime}
+    return manifest
+
+
+def write_manifest(root):
+    '''Publish a manifest with hashes in a remote presets path, so mirrors
+    do not have to walk it.'''
+
+    manifest = scan(root)
+    for relpath, info in manifest.items():
+        info['hash'] = checksum(os.path.join(root, relpath))
+
+    with open(os.path.join(root, MANIFEST_NAME), 'w') as f:
+        f.write(json.dumps(manifest, indent=4, sort_keys=True))
+    return manifest
+
+
+def read_manifest(path):
+    try:
+        with open(path, 'r') as f:
+            return json.loads(f.read())
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def is_current(local, remote):
+    '''True when a mirrored file matches the remote manifest entry.'''
+
+    if not local:
+        return False
+    if remote.get('hash') and local.get('hash'):
+        return remote['hash'] == local['hash']
+    return (
+        remote['size'] == local['size']
+        and remote['mtime'] == local.get('remote_mtime')
+    )
+
+
+def sync(remote, mirror):
+    '''Sync a mirror with its remote path.
+
+    :returns: Number of files copied or removed
+    '''
+
+    remote_manifest = read_manifest(os.path.join(remote, MANIFEST_NAME))
+    if remote_manifest is None:
+        remote_manifest = scan(remote)
+
+    local_path = os.path.join(mirror, LOCAL_MANIFEST_NAME)
+    local_manifest = read_manifest(local_path) or {}
+
+    changes = 0
+    for relpath, info in sorted(remote_manifest.items()):
+        local = local_manifest.get(relpath)
+        dst = os.path.join(mirror, *relpath.split('/'))
+        if is_current(local, info) and os.path.isfile(dst):
+            continue
+
+        dst_dir = os.path.dirname(dst)
+        if not os.path.isdir(dst_dir):
+            os.makedirs(dst_dir)
+
+        file_hash = copy_file(os.path.join(remote, *relpath.split('/')), dst)
+        if info.get('hash') and info['hash'] != file_hash:
+            # Changed while syncing, picked up by the next sync
+            os.remove(dst)
+            local_manifest.pop(relpath, None)
+            continue
+
+        local_manifest[relpath] = {
+            'size': info['size'],
+            'remote_mtime': info['mtime'],
+            'hash': file_hash,
+        }
+        changes += 1
+
+    for relpath in list(local_manifest):
+        if relpath not in remote_manifest:
+            path = os.path.join(mirror, *relpath.split('/'))
+            if os.path.exists(path):
+                os.remove(path)
+            local_manifest.pop(relpath)
+            changes += 1
+
+    write_json(local_path, local_manifest)
+
+    return changes
+
+
+def _sync(remote, mirror):
+    try:
+        changes = sync(remote, mirror)
+    except (IOError, OSError) as e:
+        print('mvp: could not sync %s, using the local mirror: %s' % (
+            remote,
+            e,
+        ))
+        return
+    if changes:
+        # Pick up the synced presets
+        from . import presets
+        presets.index.invalidate()
+
+
+def sync_async(remote, mirror):
+    '''Sync a mirror on a background thread.
+
+    :returns: The sync thread
+    '''
+
+    thread = _syncs.get(mirror)
+    if thread and thread.is_alive():
+        return thread
+
+    thread = threading.Thread(target=_sync, args=(remote, mirror))
+    thread.daemon = True
+    thread.start()
+    _syncs[mirror] = thread
+    return thread
+
+
+def get_read_path(remote):
+    '''Get the path to read presets and hooks from.
+
+    Returns the local mirror when it was synced before, otherwise the
+    remote path, and starts a background sync.
+    '''
+
+    mirror = get_mirror_path(remote)
+    if not os.path.isdir(mirror):
+        os.makedirs(mirror)
+
+    synced = is_synced(mirror)
+    sync_async(remote, mirror)
+
+    if synced:
+        mirrors[mirror] = remote
+        return mirror
+    return remote
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+'''
+Capture image sequences in parallel on a pool of worker processes.
+
+The frame range is split into chunks. Each chunk is written to a json job
+file and handed to a worker process, by default a headless mayapy that
+opens the saved scene and renders the chunk with ogsRender. Failed chunks
+are retried individually and finished chunks are stitched into the final
+image sequence in frame order.
+
+The worker command is pluggable, either per call or through
+WORKER_COMMAND, so any executable that reads a job file and writes the
+expected frames can stand in for mayapy::
+
+    parallel.WORKER_COMMAND = ['python', 'fake_worker.py', '{job}']
+'''
+from __future__ import print_function
+
+import os
+import sys
+import json
+import math
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing
+
+try:
+    import queue
+except ImportError:  # Py2 compat
+    import Queue as queue
+
+import maya.cmds as cmds
+
+from .state import EDITOR_PROPERTIES
+from .utils import frame_path
+
+
+# Command used to launch workers. None uses get_worker_command.
+WORKER_COMMAND = None
+
+
+def get_mayapy():
+    '''Path to the mayapy executable of the running Maya.'''
+
+    ext = '.exe' if sys.platform == 'win32' else ''
+    return os.path.join(
+        os.environ.get('MAYA_LOCATION', ''),
+        'bin',
+        'mayapy' + ext,
+    )
+
+
+def get_worker_command(job_path):
+    '''Default worker command, renders a job in a headless mayapy.'''
+
+    return [
+        get_mayapy(),
+        '-c',
+        (
+            'import maya.standalone; maya.standalone.initialize(); '
+            'from mvp import parallel; parallel.run_job(%r)' % job_path
+        ),
+    ]
+
+
+def build_command(command, job_path):
+    '''Build a worker command for a job.
+
+    :param command: Callable taking the job path, or a list of arguments
+        where {job} is replaced by the job path. None uses WORKER_COMMAND
+        and falls back to get_worker_command.
+    :param job_path: Path to the json job file
+    '''
+
+    command = command or WORKER_COMMAND or get_worker_command
+    if callable(command):
+        return command(job_path)
+    return [arg.replace('{job}', job_path) for arg in command]
+
+
+def save_scene_copy(directory):
+    '''Export the current scene with its unsaved changes to directory, so
+    workers render what is in the open scene. The name and modified state
+    of the open scene are left untouched.
+
+    :returns: Path to the saved copy
+    '''
+
+    scene = cmds.file(query=True, sceneName=True)
+    if os.path.splitext(scene)[1].lower() == '.mb':
+        ext, file_type = '.mb', 'mayaBinary'
+    else:
+        ext, file_type = '.ma', 'mayaAscii'
+    path = os.path.join(directory, 'scene' + ext)
+
+    cmds.file(
+        path,
+        exportAll=True,
+        preserveReferences=True,
+        type=file_type,
+        force=True,
+    )
+    return path
+
+
+def split_frames(start, end, chunk_size):
+    '''Split a frame range into (start, end) chunks of at most chunk_size
+    frames.'''
+
+    start, end = int(start), int(end)
+    chunks = []
+    for chunk_start in range(start, end + 1, chunk_size):
+        chunks.append((chunk_start, min(chunk_start + chunk_size - 1, end)))
+    return chunks
+
+
+class Chunk(object):
+    '''A range of frames rendered by a single worker process.'''
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.attempts = 0
+        self.output = None
+        self.error = None
+
+    @property
+    def frames(self):
+        return range(self.start, self.end + 1)
+
+    def __repr__(self):
+        return '<Chunk %s-%s>' % (self.start, self.end)
+
+
+def run_chunk(chunk, job, root, command, padding):
+    '''Run a worker for a chunk and wait for it to finish.
+
+    :returns: True when the worker exited cleanly and wrote every frame.
+    '''
+
+    chunk.attempts += 1
+    chunk_dir = os.path.join(
+        root,
+        '%s_%s_%s' % (chunk.start, chunk.end, chunk.attempts),
+    )
+    os.makedirs(chunk_dir)
+
+    chunk.output = os.path.join(chunk_dir, 'frame')
+    job = dict(
+        job,
+        start=chunk.start,
+        end=chunk.end,
+        output=chunk.output,
+        padding=padding,
+    )
+    job_path = os.path.join(chunk_dir, 'job.json')
+    with open(job_path, 'w') as f:
+        f.write(json.dumps(job))
+
+    with open(os.path.join(chunk_dir, 'worker.log'), 'w') as log:
+        returncode = subprocess.call(
+            build_command(command, job_path),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+    if returncode != 0:
+        chunk.error = 'Worker exited with code %s' % returncode
+        return False
+
+    for frame in chunk.frames:
+        if not os.path.isfile(frame_path(chunk.output, frame, padding)):
+            chunk.error = 'Worker did not write frame %s' % frame
+            return False
+
+    chunk.error = None
+    return True
+
+
+def parallel_playblast(filename, start, end, camera, state=None,
+                       width=960, height=540, workers=None, chunk_size=None,
+                       retries=2, command=None, scene=None, padding=4):
+    '''Capture an image sequence in parallel on a pool of workers.
+
+    Arguments:
+        :param filename: Output path without frame number and extension
+        :param start: First frame
+        :param end: Last frame
+        :param camera: Camera to capture
+        :param state: Viewport state dict, only RenderGlobals and camera
+            properties apply to headless workers
+        :param width: Resolution width
+        :param height: Resolution height
+        :param workers: Number of worker processes, defaults to half the
+            number of cpus
+        :param chunk_size: Frames per chunk, defaults to an even split
+            across workers
+        :param retries: How often a failed chunk is retried
+        :param command: Worker command, see build_command
+        :param scene: Scene to render, defaults to the current scene.
+            Unsaved changes are saved to a temporary copy for the workers.
+
+    :returns: Image sequence path like filename.####.png
+    '''
+
+    if not scene and not cmds.file(query=True, sceneName=True):
+        raise RuntimeError('Save the scene before playblasting in parallel.')
+
+    workers = workers or max(1, multiprocessing.cpu_count() // 2)
+    num_frames = int(end) - int(start) + 1
+    chunk_size = chunk_size or int(math.ceil(num_frames / float(workers)))
+    chunks = [
+        Chunk(*frames) for frames in split_frames(start, end, chunk_size)
+    ]
+
+    if hasattr(state, 'to_dict'):
+        state = state.to_dict()
+
+    ignored = [
+        name for name in EDITOR_PROPERTIES
+        if name != 'camera' and name in (state or {})
+    ]
+    if ignored:
+        print(
+            'mvp: parallel workers render without a viewport, display '
+            'settings like %s are not applied' % ', '.join(ignored[:3])
+        )
+
+    root = tempfile.mkdtemp(prefix='mvp_parallel_')
+    if not scene:
+        scene = cmds.file(query=True, sceneName=True)
+        if cmds.file(query=True, modified=True):
+            print('mvp: saving unsaved changes to a copy for the workers')
+            try:
+                scene = save_scene_copy(root)
+            except Exception:
+                shutil.rmtree(root, ignore_errors=True)
+                raise
+
+    job = dict(
+        scene=scene,
+        camera=camera,
+        state=state or {},
+        width=width,
+        height=height,
+        render_layer=cmds.editRenderLayerGlobals(
+            query=True,
+            currentRenderLayer=True,
+        ),
+    )
+
+    pending = queue.Queue()
+    for chunk in chunks:
+        pending.put(chunk)
+
+    failed = []
+
+    def work():
+        while True:
+            try:
+                chunk = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                ok = run_chunk(chunk, job, root, command, padding)
+            except (OSError, IOError) as e:
+                chunk.error = str(e)
+                ok = False
+
+            if not ok:
+                if chunk.attempts <= retries:
+                    pending.put(chunk)
+                else:
+                    failed.append(chunk)
+
+    threads = [
+        threading.Thread(target=work)
+        for _ in range(min(workers, len(chunks)))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    try:
+        if failed:
+            raise RuntimeError('Failed to capture chunks: %s' % ', '.join(
+                '%s (%s)' % (chunk, chunk.error) for chunk in failed
+            ))
+
+        # Stitch chunks into the final image sequence
+        output_dir = os.path.dirname(filename)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        for chunk in sorted(chunks, key=lambda chunk: chunk.start):
+            for frame in chunk.frames:
+                dst = frame_path(filename, frame, padding)
+                if os.path.exists(dst):
+                    os.remove(dst)
+                shutil.move(frame_path(chunk.output, frame, padding), dst)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return '%s.%s.png' % (filename, '#' * padding)
+
+
+def run_job(job_path):
+    '''Worker entry point. Renders the frames of a job file with ogsRender.
+
+    Must run in an initialized maya.standalone session.
+    '''
+
+    from .camera import set_camera_state
+    from .renderglobals import NODE
+
+    with open(job_path, 'r') as f:
+        job = json.loads(f.read())
+
+    cmds.file(job['scene'], open=True, force=True)
+    if job.get('render_layer'):
+        cmds.editRenderLayerGlobals(currentRenderLayer=job['render_layer'])
+
+    state = job['state']
+    for attr, value in (state.get('RenderGlobals') or {}).items():
+        cmds.setAttr(NODE + '.' + attr, value)
+    set_camera_state(job['camera'], state)
+
+    # Render pngs
+    cmds.setAttr('defaultRenderGlobals.imageFormat', 32)
+
+    for frame in range(job['start'], job['end'] + 1):
+        cmds.currentTime(frame)
+        image = cmds.ogsRender(
+            camera=job['camera'],
+            width=job['width'],
+            height=job['height'],
+            currentFrame=True,
+        )
+        shutil.move(image, frame_path(job['output'], frame, job['padding']))
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+'''
+Single file preset database.
+
+Presets are stored in a sqlite database as deltas over an optional base
+preset. A preset only stores the keys that differ from its base, and
+inheritance chains are resolved and cached when the database is loaded.
+The cache is reloaded when the database file changes::
+
+    db = presetdb.get_db()
+    db.save('Anim', viewport.get_state())
+    db.save('Anim Wire', wire_state, base='Anim')
+
+    db.get('Anim Wire')        # Resolved state
+    db.get_delta('Anim Wire')  # Only the keys overriding Anim
+
+Enable it with MVP_PRESET_BACKEND=sqlite. :mod:`mvp.presets` then reads
+presets from the database as well as json files and stores new presets
+in the database.
+'''
+
+import os
+import copy
+import json
+import time
+import sqlite3
+
+from . import config
+from .state import ViewportState
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS presets (
+    name TEXT PRIMARY KEY,
+    base TEXT,
+    delta TEXT NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS presets_base ON presets (base);
+'''
+
+_db = []
+
+
+def merge(state, delta):
+    '''Apply a delta to a state dict, RenderGlobals are merged by key.'''
+
+    state = copy.deepcopy(state)
+    for key, value in delta.items():
+        if key == 'RenderGlobals' and isinstance(value, dict):
+            render_globals = dict(state.get('RenderGlobals') or {})
+            render_globals.update(value)
+            state[key] = render_globals
+        else:
+            state[key] = copy.deepcopy(value)
+    return state
+
+
+class PresetDB(object):
+    '''Presets stored as deltas in a sqlite database.
+
+    :param path: Path to the database file
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._rows = {}
+        self._resolved = {}
+        self._mtime = None
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        connection = self.connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def load(self):
+        '''Load all presets and resolve their inheritance chains. Does
+        nothing when the database file did not change.'''
+
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                'SELECT name, base, delta, mtime FROM presets'
+            ).fetchall()
+        finally:
+            connection.close()
+
+        self._rows = dict(
+            (name, (base, json.loads(delta), row_mtime))
+            for name, base, delta, row_mtime in rows
+        )
+        self._resolved = {}
+        for name in self._rows:
+            self._resolve(name, [])
+        self._mtime = mtime
+
+    def _resolve(self, name, chain):
+        if name in self._resolved:
+            return self._resolved[name]
+
+        if name in chain:
+            raise RuntimeError(
+                'Circular preset inheritance: %s' % ' > '.join(chain + [name])
+            )
+
+        base, delta, _ = self._rows[name]
+        if base is None:
+            state = copy.deepcopy(delta)
+        elif base not in self._rows:
+            raise RuntimeError(
+                'Preset %s inherits a missing preset %s' % (name, base)
+            )
+        else:
+            state = merge(self._resolve(base, chain + [name]), delta)
+
+        self._resolved[name] = state
+        return state
+
+    def names(self):
+        self.load()
+        return sorted(self._rows)
+
+    def __contains__(self, name):
+        self.load()
+        return name in self._rows
+
+    def get(self, name):
+        '''Get a copy of a resolved preset or None.'''
+
+        self.load()
+        if name not in self._resolved:
+            return None
+        return copy.deepcopy(self._resolved[name])
+
+    def get_base(self, name):
+        self.load()
+        if name in self._rows:
+            return self._rows[name][0]
+
+    def get_delta(self, name):
+        '''Get the keys a preset overrides on its base. Setting these on a
+        viewport showing the base preset only touches those keys.'''
+
+        self.load()
+        if name not in self._rows:
+            return None
+        return copy.deepcopy(self._rows[name][1])
+
+    def get_version(self, name):
+        '''A value that changes whenever the resolved preset changes.'''
+
+        self.load()
+        if name not in self._rows:
+            return None
+
+        version = []
+        while name is not None:
+            base, _, mtime = self._rows[name]
+            version.append((name, mtime))
+            name = base
+        return tuple(version)
+
+    def save(self, name, state, base=None):
+        '''Store a preset as a delta over base.
+
+        :param name: Name of the preset
+        :param state: Full viewport state dict or ViewportState
+        :param base: Optional name of the base preset
+        '''
+
+        self.load()
+        if isinstance(state, ViewportState):
+            state = state.to_dict()
+
+        if base is None:
+            delta = state
+        else:
+            if base not in self._rows:
+                raise RuntimeError('Base preset %s does not exist' % base)
+            if name in [n for n, _ in self.get_version(base)]:
+                raise RuntimeError(
+                    'Preset %s can not inherit %s which inherits it' % (
+                        name,
+                        base,
+                    )
+                )
+            delta = ViewportState(self._resolved[base]).diff(state)
+
+        self._write([(name, base, delta)])
+
+    def delete(self, name):
+        '''Delete a preset. Presets inheriting it inherit its base instead
+        and keep their resolved state.'''
+
+        self.load()
+        if name not in self._rows:
+            return
+
+        base = self._rows[name][0]
+        base_state = ViewportState(self._resolved[base] if base else {})
+        children = [
+            (child, base, base_state.diff(self._resolved[child]))
+            for child, row in self._rows.items()
+            if row[0] == name
+        ]
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute(
+                    'DELETE FROM presets WHERE name = ?',
+                    (name,),
+                )
+                self._insert(connection, children)
+        finally:
+            connection.close()
+        self._mtime = None
+
+    def _insert(self, connection, rows):
+        now = time.time()
+        connection.executemany(
+            'INSERT OR REPLACE INTO presets (name, base, delta, mtime) '
+            'VALUES (?, ?, ?, ?)',
+            [
+                (name, base, json.dumps(delta, sort_keys=True), now)
+                for name, base, delta in rows
+            ],
+        )
+
+    def _write(self, rows):
+        connection = self.connect()
+        try:
+            with connection:
+                self._insert(connection, rows)
+        finally:
+            connection.close()
+        self._mtime = None
+
+    def import_presets(self, presets, base=None):
+        '''Import presets, for example json presets, as deltas over base.
+
+        :param presets: Iterable of name, state pairs
+        :param base: Optional name of the base preset
+        '''
+
+        self.load()
+        base_state = ViewportState(self._resolved[base]) if base else None
+        rows = []
+        for name, state in presets:
+            if name == base:
+                continue
+            if base_state is None:
+                rows.append((name, None, state))
+            else:
+                rows.append((name, base, base_state.diff(state)))
+        self._write(rows)
+
+
+def get_db_path():
+    return os.environ.get(
+        'MVP_PRESET_DB',
+        os.path.join(config.USER_PRESETS_PATH, 'presets.db'),
+    )
+
+
+def get_db():
+    '''Get the shared PresetDB.'''
+
+    path = get_db_path()
+    if not _db or _db[0].path != path:
+        _db[:] = [PresetDB(path)]
+    return _db[0]
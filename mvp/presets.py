@@ -1,50 +1,187 @@
 # -*- coding: utf-8 -*-
 
-import json
-import glob
 import os
+import copy
+import json
 from . import config
+from .state import ViewportState
 
 
-def get_presets():
-    '''Get a generator yielding preset name, data pairs'''
+class PresetIndex(object):
+    '''Maps preset names to paths and parsed presets.
 
-    for path in config.PRESETS_PATH:
-        for f in glob.glob(os.path.join(path, '*.json')):
+    Directories are rescanned when their mtime changes and presets are
+    parsed on first use and again when their file changes. When a name
+    exists in several presets paths, the first path wins.
+    '''
 
-            base = os.path.basename(f)
-            name = os.path.splitext(base)[0]
+    def __init__(self):
+        self._dirs = {}
+        self._paths = []
+        self._entries = {}
+
+    def invalidate(self):
+        self._dirs.clear()
+        self._paths = []
+        self._entries.clear()
+
+    def refresh(self):
+        '''Rescan presets paths whose mtime changed.'''
+
+        config.ensure_init()
+        paths = list(config.PRESETS_PATH)
+        changed = paths != self._paths
+        for path in paths:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = None
+
+            if path not in self._dirs or self._dirs[path][0] != mtime:
+                self._dirs[path] = (mtime, self._scan(path))
+                changed = True
+
+        if changed:
+            self._paths = paths
+            self._rebuild()
+
+    def _scan(self, path):
+        try:
+            files = os.listdir(path)
+        except OSError:
+            return []
+        return sorted(
+            (os.path.splitext(f)[0], os.path.join(path, f))
+            for f in files if f.endswith('.json')
+        )
+
+    def _rebuild(self):
+        entries = {}
+        for path in self._paths:
+            for name, preset_path in self._dirs[path][1]:
+                if name in entries:
+                    continue
+                entry = self._entries.get(name)
+                if entry and entry[0] == preset_path:
+                    entries[name] = entry
+                else:
+                    entries[name] = [preset_path, None, None]
+        self._entries = entries
+
+    def names(self):
+        '''Sorted preset names, does not read any preset.'''
+
+        self.refresh()
+        return sorted(self._entries)
+
+    def path(self, name):
+        self.refresh()
+        entry = self._entries.get(name)
+        return entry[0] if entry else None
+
+    def get(self, name):
+        '''Get a copy of a parsed preset or None.'''
+
+        self.refresh()
+        entry = self._entries.get(name)
+        if not entry:
+            return None
+
+        try:
+            st = os.stat(entry[0])
+        except OSError:
+            return None
+
+        key = (st.st_mtime, st.st_size)
+        if entry[1] != key:
+            with open(entry[0], 'r') as f:
+                entry[2] = json.loads(f.read())
+            entry[1] = key
+        return copy.deepcopy(entry[2])
+
+
+index = PresetIndex()
+
+
+def get_remote_path(path):
+    '''Remote path of a mirrored presets path, see :mod:`mvp.mirror`.'''
+
+    if config.MIRROR_PRESETS:
+        from . import mirror
+        return mirror.get_remote_path(path)
+    return path
+
+
+def get_db():
+    '''Get the preset database when MVP_PRESET_BACKEND is sqlite, see
+    :mod:`mvp.presetdb`.'''
+
+    if config.PRESET_BACKEND == 'sqlite':
+        from . import presetdb
+        return presetdb.get_db()
+
+
+def get_preset_names():
+    '''Get a sorted list of preset names'''
+
+    names = index.names()
+    db = get_db()
+    if db:
+        names = sorted(set(names) | set(db.names()))
+    return names
 
-            with open(f, 'r') as f:
-                data = json.loads(f.read())
 
+def get_presets():
+    '''Get a generator yielding preset name, data pairs'''
+
+    for name in get_preset_names():
+        data = get_preset(name)
+        if data is not None:
             yield name, data
 
 
 def get_preset(name):
     '''Get a preset by name'''
 
-    for n, s in get_presets():
-        if name == n:
-            return s
+    data = index.get(name)
+    if data is None:
+        db = get_db()
+        if db:
+            data = db.get(name)
+    return data
+
+
+def get_preset_version(name):
+    '''Get a value that changes whenever a preset changes.'''
+
+    path = index.path(name)
+    if path and os.path.isfile(path):
+        return (path, os.path.getmtime(path))
+
+    db = get_db()
+    if db and name in db:
+        return (db.path, db.get_version(name))
+
+    raise ValueError('Could not find a preset named %s', name)
 
 
 def find_preset(name):
     '''Find the path to a given preset...'''
 
-    for path in config.PRESETS_PATH:
-        prospect = os.path.join(path, name + '.json')
-        if os.path.isfile(prospect):
-            return prospect
+    path = index.path(name)
+    if path and os.path.isfile(path):
+        return path
 
     raise ValueError('Could not find a preset named %s', name)
 
 
-def new_preset(name, data):
+def new_preset(name, data, base=None):
     '''Create a new preset from viewport state data
 
     :param name: Name of the preset
-    :param data: Viewport state dict
+    :param data: Viewport state dict or ViewportState
+    :param base: Name of a preset to inherit, only stores the difference to
+        base. Requires the sqlite preset backend.
 
     usage::
 
@@ -53,13 +190,39 @@ def new_preset(name, data):
         mvp.new_preset('NewPreset1', active.get_state())
     '''
 
-    preset_path = os.path.join(config.PRESETS_PATH[0], name + '.json')
-    with open(preset_path, 'w') as f:
-        f.write(json.dumps(data))
+    if isinstance(data, ViewportState):
+        data = data.to_dict()
+
+    db = get_db()
+    if db:
+        db.save(name, data, base=base)
+        return
+
+    if base:
+        raise RuntimeError('Inheriting presets requires the sqlite backend.')
+
+    config.ensure_init()
+    path = config.PRESETS_PATH[0]
+    for preset_dir in set([get_remote_path(path), path]):
+        preset_path = os.path.join(preset_dir, name + '.json')
+        with open(preset_path, 'w') as f:
+            f.write(json.dumps(data))
+    index.invalidate()
 
 
 def del_preset(name):
 
+    db = get_db()
+    if db and index.path(name) is None and name in db:
+        db.delete(name)
+        return
+
     preset_path = find_preset(name)
-    if os.path.exists(preset_path):
-        os.remove(preset_path)
+    remote_path = os.path.join(
+        get_remote_path(os.path.dirname(preset_path)),
+        os.path.basename(preset_path),
+    )
+    for path in set([remote_path, preset_path]):
+        if os.path.exists(path):
+            os.remove(path)
+    index.invalidate()
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+'''
+Progressive image sequence capture.
+
+Frames are captured in passes of decreasing step, every 8th frame first,
+then every 4th, 2nd and finally every frame. Each frame is written to its
+final slot in the sequence. Slots that are not captured yet hold a
+hardlink to the closest earlier captured frame, so the sequence plays
+from the first pass on and gets smoother with every pass.
+
+A capture stops after the current batch of frames when cancelled through
+:func:`cancel` or the cancel event passed to :func:`progressive_playblast`.
+'''
+from __future__ import print_function
+
+import os
+import threading
+
+from .dedupe import link_frame, remove_frames
+from .utils import frame_path, get_qapp, viewport_state
+
+
+STEPS = (8, 4, 2, 1)
+
+# Frames captured per playblast call, cancellation is checked in between
+BATCH_SIZE = 8
+
+_active = []
+
+
+def get_passes(start, end, steps=STEPS):
+    '''Get the frames captured by each pass.
+
+    :returns: List of (step, frames) tuples
+    '''
+
+    start, end = int(start), int(end)
+    steps = sorted(set(steps), reverse=True)
+    if 1 not in steps:
+        steps.append(1)
+
+    captured = set()
+    passes = []
+    for step in steps:
+        frames = [
+            frame for frame in range(start, end + 1, step)
+            if frame not in captured
+        ]
+        # Always include the last frame in the first pass
+        if not passes and end not in frames:
+            frames.append(end)
+        captured.update(frames)
+        if frames:
+            passes.append((step, frames))
+    return passes
+
+
+def fill_frames(prefix, start, end, captured, padding=4):
+    '''Link every frame that was not captured yet to the closest earlier
+    captured frame.'''
+
+    source = None
+    for frame in range(int(start), int(end) + 1):
+        if frame in captured:
+            source = frame
+        elif source is not None:
+            link_frame(
+                frame_path(prefix, source, padding),
+                frame_path(prefix, frame, padding),
+            )
+
+
+def cancel():
+    '''Cancel the running progressive captures.'''
+
+    for event in _active:
+        event.set()
+
+
+def progressive_playblast(filename, start, end, camera, state=None,
+                          width=960, height=540, padding=4, steps=STEPS,
+                          callback=None, cancel_event=None):
+    '''Capture a png sequence progressively.
+
+    Arguments:
+        :param filename: Output path without frame number and extension
+        :param start: First frame
+        :param end: Last frame
+        :param camera: Camera to capture
+        :param state: Viewport state
+        :param width: Resolution width
+        :param height: Resolution height
+        :param steps: Frame steps of the passes
+        :param callback: Called with (step, frames) after each pass
+        :param cancel_event: threading.Event that stops the capture
+
+    :returns: Image sequence path like filename.####.png
+    '''
+
+    from .viewport import Viewport, playblast
+
+    state = dict(state or {})
+    state['camera'] = camera
+    cancel_event = cancel_event or threading.Event()
+
+    output_dir = os.path.dirname(filename)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    app = get_qapp()
+    captured = set()
+    _active.append(cancel_event)
+    try:
+        with viewport_state(Viewport.active(), state):
+            for step, frames in get_passes(start, end, steps):
+                for i in range(0, len(frames), BATCH_SIZE):
+                    # Let a cancel button or hotkey run between batches
+                    if app:
+                        app.processEvents()
+                    if cancel_event.is_set():
+                        print('mvp: progressive capture cancelled')
+                        return '%s.%s.png' % (filename, '#' * padding)
+
+                    batch = frames[i:i + BATCH_SIZE]
+                    remove_frames(filename, batch, padding)
+                    playblast(
+                        state=state,
+                        format='image',
+                        compression='png',
+                        filename=filename,
+                        frame=batch,
+                        width=width,
+                        height=height,
+                        framePadding=padding,
+                    )
+                    captured.update(batch)
+
+                if step > 1:
+                    fill_frames(filename, start, end, captured, padding)
+                if callback:
+                    callback(step, frames)
+    finally:
+        _active.remove(cancel_event)
+
+    return '%s.%s.png' % (filename, '#' * padding)
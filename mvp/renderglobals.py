@@ -1,13 +1,55 @@
 # -*- coding: utf-8 -*-
 
 import maya.cmds as cmds
+import maya.OpenMaya as OpenMaya
 
-RENDER_GLOBALS = [
-    'multiSampleEnable', 'multiSampleCount', 'colorBakeResolution',
-    'bumpBakeResolution', 'motionBlurEnable', 'motionBlurSampleCount',
-    'ssaoEnable', 'ssaoAmount', 'ssaoRadius', 'ssaoFilterRadius',
-    'ssaoSamples'
-]
+from .state import RENDER_GLOBALS
+from .utils import diff_values, defer_edit
+
+NODE = 'hardwareRenderingGlobals'
+
+# Mirror of RENDER_GLOBALS attribute values and the callbacks keeping it valid
+_cache = {}
+_node_callbacks = []
+_scene_callbacks = []
+
+
+def invalidate(*args):
+    '''Clear the cached render globals.'''
+
+    _cache.clear()
+
+
+def _on_scene_changed(*args):
+    '''A new scene has a new hardwareRenderingGlobals node to watch.'''
+
+    invalidate()
+    for callback_id in _node_callbacks:
+        OpenMaya.MMessage.removeCallback(callback_id)
+    del _node_callbacks[:]
+
+
+def _watch():
+    '''Register callbacks that invalidate the cache when the render globals
+    change or a scene is opened.'''
+
+    if not _scene_callbacks:
+        for message in (
+            OpenMaya.MSceneMessage.kAfterOpen,
+            OpenMaya.MSceneMessage.kAfterNew,
+        ):
+            _scene_callbacks.append(
+                OpenMaya.MSceneMessage.addCallback(message, _on_scene_changed)
+            )
+
+    if not _node_callbacks:
+        sel = OpenMaya.MSelectionList()
+        sel.add(NODE)
+        node = OpenMaya.MObject()
+        sel.getDependNode(0, node)
+        _node_callbacks.append(
+            OpenMaya.MNodeMessage.addAttributeChangedCallback(node, invalidate)
+        )
 
 
 class RenderGlobals(object):
@@ -18,10 +60,14 @@ class RenderGlobals(object):
     '''
 
     def __getattr__(self, name):
-        return cmds.getAttr('hardwareRenderingGlobals.' + name)
+        if name in RENDER_GLOBALS:
+            return self.get_state()[name]
+        return cmds.getAttr(NODE + '.' + name)
 
     def __setattr__(self, name, value):
-        cmds.setAttr('hardwareRenderingGlobals.' + name, value)
+        if defer_edit(self.__setattr__, name, value):
+            return
+        cmds.setAttr(NODE + '.' + name, value)
 
     @property
     def properties(self):
@@ -30,21 +76,38 @@ class RenderGlobals(object):
 
     def get_state(self):
         '''Collect hardwareRenderingGlobals attributes that effect
-        Viewports.'''
+        Viewports. The values are cached until an attribute of
+        hardwareRenderingGlobals changes or a scene is opened.'''
 
-        active_state = {}
-        for attr in RENDER_GLOBALS:
-            active_state[attr] = getattr(self, attr)
+        if not _cache:
+            _watch()
+            for attr in RENDER_GLOBALS:
+                _cache[attr] = cmds.getAttr(NODE + '.' + attr)
 
-        return active_state
+        return dict(_cache)
 
-    def set_state(self, state):
+    def set_state(self, state, diff=False, current=None):
         '''Set a bunch of hardwareRenderingGlobals all at once.
 
-        :param state: Dict containing attr, value pairs'''
+        :param state: Dict containing attr, value pairs
+        :param diff: Only set attributes that differ from the current state
+        :param current: State to diff against, defaults to get_state()
+        :returns: Previous values of the attributes that were set when diff
+            is True'''
 
-        for k, v in state.items():
+        if not diff:
+            for k, v in state.items():
+                setattr(self, k, v)
+            return
+
+        if current is None:
+            current = self.get_state()
+
+        changes = diff_values(current, state)
+        for k, v in changes.items():
             setattr(self, k, v)
 
+        return dict((k, current[k]) for k in changes if k in current)
+
 
 RenderGlobals = RenderGlobals()
@@ -7,6 +7,18 @@ from maya import cmds
 
 @contextmanager
 def enabled_render_layers():
+    '''Yield the renderable render setup layers.
+
+    The visible layer comes first so the first capture does not have to
+    switch layers, and switching to the visible layer is a no-op. The
+    original layer is only restored when a switch happened.
+
+    The other layers keep their render setup order. A switch unapplies the
+    overrides of the current layer and applies those of the next one, so
+    every other layer is entered and left exactly once, whatever the
+    order. Only starting on the visible layer saves switches.
+    '''
+
     old_layer = cmds.editRenderLayerGlobals(
         query=True,
         currentRenderLayer=True,
@@ -16,7 +28,8 @@ def enabled_render_layers():
 
         def switchToLayer(layer):
             def _switch():
-                rs.switchToLayer(layer)
+                if rs.getVisibleRenderLayer().name() != layer.name():
+                    rs.switchToLayer(layer)
             return _switch
 
         enabled_layers = []
@@ -26,6 +39,14 @@ def enabled_render_layers():
             if layer.isRenderable():
                 enabled_layers.append(layer)
 
+        visible_layer = rs.getVisibleRenderLayer().name()
+        enabled_layers.sort(key=lambda layer: layer.name() != visible_layer)
+
         yield enabled_layers
     finally:
-        cmds.editRenderLayerGlobals(currentRenderLayer=old_layer)
+        current_layer = cmds.editRenderLayerGlobals(
+            query=True,
+            currentRenderLayer=True,
+        )
+        if current_layer != old_layer:
+            cmds.editRenderLayerGlobals(currentRenderLayer=old_layer)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+'''
+Stage captures on a local disk and transfer them to their final location
+in the background.
+
+Writing many small frames to a network share is slow. With staging,
+captures are written to config.STAGING_PATH and a persistent background job
+copies them to the final path afterwards. Files are copied in bulk on a few
+threads and verified with a checksum. A transfer that was interrupted
+resumes where it stopped, since files that are already verified at the
+destination are skipped. Files written next to the output, like the
+manifest of an incremental capture, are transferred with it::
+
+    staged = staging.get_staging_path(filename)
+    out_file = playblast(filename=staged, ...)
+    future = staging.submit_transfer(out_file, filename, start, end)
+    final = future.result()
+'''
+
+import os
+import re
+import hashlib
+from functools import partial
+
+try:
+    from concurrent import futures
+except ImportError:  # Py2 compat, requires the futures backport
+    futures = None
+
+
+from . import config
+from .fingerprint import get_manifest_path
+from .utils import (
+    expand_frames, replace_file, require_futures, when_done,
+)
+
+
+# Bytes copied at once
+BUFFER_SIZE = 16 * 1024 * 1024
+
+# Files copied at the same time when transferring image sequences
+TRANSFER_WORKERS = 4
+
+
+def get_staging_path(filename):
+    '''Get the local staging path for an output filename.'''
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    key = hashlib.md5(directory.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(config.STAGING_PATH, key, os.path.basename(filename))
+
+
+def get_final_path(staged, filename):
+    '''Get the final path of a staged output. The output may differ from
+    the staging path, for example an image sequence like name.####.png.'''
+
+    return os.path.join(
+        os.path.dirname(os.path.abspath(filename)),
+        os.path.basename(staged),
+    )
+
+
+def checksum(path):
+    '''Sha1 of a file.'''
+
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(BUFFER_SIZE)
+            if not data:
+                break
+            sha.update(data)
+    return sha.hexdigest()
+
+
+def copy_file(src, dst):
+    '''Copy a file and verify the copy with a checksum. The file is written
+    next to dst and moved in place once verified, so dst is never partial.
+
+    :returns: Checksum of the file
+    '''
+
+    sha = hashlib.sha1()
+    part = dst + '.part'
+    with open(src, 'rb') as fsrc:
+        with open(part, 'wb') as fdst:
+            while True:
+                data = fsrc.read(BUFFER_SIZE)
+                if not data:
+                    break
+                sha.update(data)
+                fdst.write(data)
+
+    src_checksum = sha.hexdigest()
+    if checksum(part) != src_checksum:
+        os.remove(part)
+        raise IOError('Checksum mismatch copying %s to %s' % (src, dst))
+
+    replace_file(part, dst)
+    return src_checksum
+
+
+def get_sidecars(filename):
+    '''Files written next to an output, like the manifest of an incremental
+    capture of name.####.png.'''
+
+    match = re.search(r'\.?#+', filename)
+    if match:
+        prefix = filename[:match.start()]
+    else:
+        prefix = os.path.splitext(filename)[0]
+    return [get_manifest_path(prefix)]
+
+
+def transfer_file(src, dst):
+    '''Move a staged file to dst. Files already transferred by an
+    interrupted transfer are skipped.'''
+
+    if not os.path.exists(src):
+        if os.path.exists(dst):
+            # Transferred before the transfer was interrupted
+            return
+        raise IOError('Staged file is missing: %s' % src)
+
+    if not (os.path.exists(dst) and checksum(dst) == checksum(src)):
+        copy_file(src, dst)
+    os.remove(src)
+
+
+def transfer(staged, filename, start=None, end=None):
+    '''Transfer a staged output to its final location.
+
+    Arguments:
+        :param staged: Staged output, a file or an image sequence like
+            name.####.png
+        :param filename: Output filename the capture was staged for
+        :param start: First frame of an image sequence
+        :param end: Last frame of an image sequence
+
+    :returns: Final path of the output
+    '''
+
+    final = get_final_path(staged, filename)
+    final_dir = os.path.dirname(final)
+    if not os.path.isdir(final_dir):
+        os.makedirs(final_dir)
+
+    pairs = list(zip(
+        expand_frames(staged, start, end),
+        expand_frames(final, start, end),
+    ))
+    if len(pairs) == 1:
+        transfer_file(*pairs[0])
+    else:
+        pool = futures.ThreadPoolExecutor(TRANSFER_WORKERS)
+        try:
+            for future in [pool.submit(transfer_file, *p) for p in pairs]:
+                future.result()
+        finally:
+            pool.shutdown()
+
+    # Sidecars go last, a manifest at the final path never lists frames
+    # that are not there yet
+    for src, dst in zip(get_sidecars(staged), get_sidecars(final)):
+        if os.path.exists(src):
+            transfer_file(src, dst)
+
+    staged_dir = os.path.dirname(staged)
+    try:
+        os.rmdir(staged_dir)
+    except OSError:
+        pass
+
+    return final
+
+
+def submit_transfer(staged, filename, start=None, end=None, after=()):
+    '''Transfer a staged output on the persistent job queue, see
+    :func:`transfer`.
+
+    :param after: Futures to wait for before the transfer is queued, like
+        postrender hooks still working on the staged output
+    :returns: Future resolving to the final path of the output
+    '''
+
+    from . import jobs
+
+    require_futures()
+    future = futures.Future()
+
+    def submit():
+        job = jobs.get_queue().submit(
+            'mvp.staging:transfer',
+            args=[staged, filename, start, end],
+            group='staging',
+        )
+        job.future.add_done_callback(partial(_chain, future))
+
+    when_done(after, submit)
+    return future
+
+
+def _chain(future, job_future):
+    if job_future.cancelled():
+        future.cancel()
+    elif job_future.exception() is not None:
+        future.set_exception(job_future.exception())
+    else:
+        future.set_result(job_future.result())
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+'''
+Viewport state tables and the ViewportState type.
+
+This module does not depend on Maya, so states can be created, compared
+and serialized by tools running outside of Maya.
+'''
+
+import json
+
+
+EDITOR_PROPERTIES = [
+    'activeComponentsXray',
+    'activeOnly',
+    'backfaceCulling',
+    'bufferMode',
+    'bumpResolution',
+    'camera',
+    'cameras',
+    'clipGhosts',
+    'colorResolution',
+    'controllers',
+    'controlVertices',
+    'cullingOverride',
+    'deformers',
+    'depthOfField',
+    'dimensions',
+    'displayAppearance',
+    'displayLights',
+    'displayTextures',
+    'dynamicConstraints',
+    'dynamics',
+    'fluids',
+    'fogColor',
+    'fogDensity',
+    'fogEnd',
+    'fogging',
+    'fogMode',
+    'fogSource',
+    'fogStart',
+    'follicles',
+    'gpuCacheDisplayFilter',
+    'greasePencils',
+    'grid',
+    'hairSystems',
+    'handles',
+    'headsUpDisplay',
+    'hulls',
+    'ignorePanZoom',
+    'ikHandles',
+    'imagePlane',
+    'interactiveBackFaceCull',
+    'interactiveDisableShadows',
+    'isFiltered',
+    'joints',
+    'jointXray',
+    'lights',
+    'lineWidth',
+    'locators',
+    'lowQualityLighting',
+    'manipulators',
+    'maxConstantTransparency',
+    'maximumNumHardwareLights',
+    'motionTrails',
+    'nCloths',
+    'nParticles',
+    'nRigids',
+    'nurbsCurves',
+    'nurbsSurfaces',
+    'objectFilterShowInHUD',
+    'occlusionCulling',
+    'particleInstancers',
+    'pivots',
+    'planes',
+    'pluginShapes',
+    'polymeshes',
+    'rendererName',
+    'selectionHiliteDisplay',
+    'shadingModel',
+    'shadows',
+    'smallObjectCulling',
+    'smallObjectThreshold',
+    'smoothWireframe',
+    'sortTransparent',
+    'strokes',
+    'subdivSurfaces',
+    'textureAnisotropic',
+    'textureCompression',
+    'textureDisplay',
+    'textureHilight',
+    'textureMaxSize',
+    'textures',
+    'textureSampling',
+    'transparencyAlgorithm',
+    'transpInShadows',
+    'twoSidedLighting',
+    'useBaseRenderer',
+    'useDefaultMaterial',
+    'useInteractiveMode',
+    'useReducedRenderer',
+    'viewSelected',
+    'wireframeOnShaded',
+    'xray',
+]
+
+CAMERA_PROPERTIES = [
+    'displayFilmGate',
+    'displayResolution',
+    'displayGateMask',
+    'displayFieldChart',
+    'displaySafeAction',
+    'displaySafeTitle',
+    'displayFilmPivot',
+    'displayFilmOrigin',
+    'overscan',
+    'displayGateMaskOpacity',
+    'displayGateMaskColor'
+]
+
+RENDER_GLOBALS = [
+    'multiSampleEnable', 'multiSampleCount', 'colorBakeResolution',
+    'bumpBakeResolution', 'motionBlurEnable', 'motionBlurSampleCount',
+    'ssaoEnable', 'ssaoAmount', 'ssaoRadius', 'ssaoFilterRadius',
+    'ssaoSamples'
+]
+
+PROPERTIES = EDITOR_PROPERTIES + CAMERA_PROPERTIES
+PROPERTY_INDEX = dict((name, i) for i, name in enumerate(PROPERTIES))
+RENDER_GLOBALS_INDEX = dict((name, i) for i, name in enumerate(RENDER_GLOBALS))
+
+
+class _Missing(object):
+    '''Marks a property that is not part of a ViewportState.'''
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __bool__(self):
+        return False
+
+    __nonzero__ = __bool__
+
+
+MISSING = _Missing()
+
+
+def values_equal(a, b, tolerance=1e-5):
+    '''Compare two state values. Floats are compared with a tolerance and
+    lists and tuples are compared item by item.'''
+
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        if len(a) != len(b):
+            return False
+        return all(values_equal(x, y, tolerance) for x, y in zip(a, b))
+
+    if isinstance(a, float) or isinstance(b, float):
+        try:
+            return abs(float(a) - float(b)) <= tolerance
+        except (TypeError, ValueError):
+            return False
+
+    return a == b
+
+
+def _changed(a, b):
+    '''True when b is set and differs from a.'''
+
+    return b is not MISSING and (a is MISSING or not values_equal(a, b))
+
+
+class _FrozenDict(tuple):
+    '''Sorted (key, value) items of a frozen dict.'''
+
+    __slots__ = ()
+
+
+def freeze(value):
+    '''Convert lists to tuples and dicts to sorted item tuples so values
+    are hashable.'''
+
+    if isinstance(value, dict):
+        return _FrozenDict(sorted(
+            ((k, freeze(v)) for k, v in value.items()),
+            key=lambda item: repr(item[0]),
+        ))
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    '''Convert frozen values back to lists and dicts like they are stored
+    in json.'''
+
+    if isinstance(value, _FrozenDict):
+        return dict((k, thaw(v)) for k, v in value)
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+class ViewportState(object):
+    '''An immutable viewport state.
+
+    Values are stored in tuples ordered like PROPERTIES and RENDER_GLOBALS.
+    Keys that are not part of those tables are kept aside so a state
+    round-trips losslessly to the json preset format. Equality and hashing
+    are exact while diff compares floats with a tolerance::
+
+        state = ViewportState(viewport.get_state())
+        other = ViewportState(presets.get_preset('Lighting'))
+
+        if state != other:
+            viewport.set_state(state.diff(other))
+
+    :param state: Optional dict in the preset format or ViewportState
+    '''
+
+    __slots__ = ('_values', '_render_globals', '_extra', '_hash')
+
+    def __init__(self, state=None):
+        if isinstance(state, ViewportState):
+            self._values = state._values
+            self._render_globals = state._render_globals
+            self._extra = state._extra
+            self._hash = state._hash
+            return
+
+        values = [MISSING] * len(PROPERTIES)
+        render_globals = None
+        extra = []
+
+        for key, value in (state or {}).items():
+            if key == 'RenderGlobals':
+                if value is None:
+                    continue
+                render_globals = [MISSING] * len(RENDER_GLOBALS)
+                for attr, attr_value in value.items():
+                    index = RENDER_GLOBALS_INDEX.get(attr)
+                    if index is None:
+                        extra.append(((key, attr), freeze(attr_value)))
+                    else:
+                        render_globals[index] = freeze(attr_value)
+                continue
+
+            index = PROPERTY_INDEX.get(key)
+            if index is None:
+                extra.append(((None, key), freeze(value)))
+            else:
+                values[index] = freeze(value)
+
+        self._values = tuple(values)
+        if render_globals is None:
+            self._render_globals = None
+        else:
+            self._render_globals = tuple(render_globals)
+        self._extra = tuple(sorted(extra, key=lambda item: repr(item[0])))
+        self._hash = None
+
+    @classmethod
+    def _from_parts(cls, values, render_globals, extra):
+        state = cls.__new__(cls)
+        state._values = tuple(values)
+        if render_globals is None:
+            state._render_globals = None
+        else:
+            state._render_globals = tuple(render_globals)
+        state._extra = tuple(sorted(extra, key=lambda item: repr(item[0])))
+        state._hash = None
+        return state
+
+    @classmethod
+    def from_json(cls, data):
+        '''Create a ViewportState from a json preset string.'''
+
+        return cls(json.loads(data))
+
+    def to_json(self):
+        '''Serialize to a json preset string.'''
+
+        return json.dumps(self.to_dict())
+
+    def to_dict(self):
+        '''Convert to a state dict in the preset format.'''
+
+        state = {}
+        for name, value in zip(PROPERTIES, self._values):
+            if value is not MISSING:
+                state[name] = thaw(value)
+
+        if self._render_globals is not None:
+            state['RenderGlobals'] = dict(
+                (attr, thaw(value))
+                for attr, value in zip(RENDER_GLOBALS, self._render_globals)
+                if value is not MISSING
+            )
+
+        for (section, key), value in self._extra:
+            if section is None:
+                state[key] = thaw(value)
+            else:
+                state.setdefault(section, {})[key] = thaw(value)
+
+        return state
+
+    @property
+    def render_globals(self):
+        '''Dict of RenderGlobals or None.'''
+
+        return self.to_dict().get('RenderGlobals')
+
+    def keys(self):
+        '''Top level keys in the preset format.'''
+
+        return list(self.to_dict().keys())
+
+    def get(self, key, default=None):
+        index = PROPERTY_INDEX.get(key)
+        if index is not None:
+            value = self._values[index]
+            return default if value is MISSING else value
+
+        if key == 'RenderGlobals':
+            render_globals = self.render_globals
+            return default if render_globals is None else render_globals
+
+        for (section, extra_key), value in self._extra:
+            if section is None and extra_key == key:
+                return value
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if not isinstance(other, ViewportState):
+            return NotImplemented
+        return (
+            self._values == other._values
+            and self._render_globals == other._render_globals
+            and self._extra == other._extra
+        )
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((
+                self._values,
+                self._render_globals,
+                self._extra,
+            ))
+        return self._hash
+
+    def __repr__(self):
+        return '<ViewportState %d properties>' % len(self)
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def diff(self, other):
+        '''Get the properties of other that differ from this state. Floats
+        are compared with a small tolerance. RenderGlobals that are not in
+        RENDER_GLOBALS are left out, they are never applied.
+
+        :param other: ViewportState or dict
+        :returns: Dict of changes in the preset format
+        '''
+
+        other = ViewportState(other)
+        changes = {}
+
+        for name, a, b in zip(PROPERTIES, self._values, other._values):
+            if _changed(a, b):
+                changes[name] = thaw(b)
+
+        if other._render_globals is not None:
+            current = self._render_globals or (MISSING,) * len(RENDER_GLOBALS)
+            render_globals = dict(
+                (attr, thaw(b))
+                for attr, a, b in zip(
+                    RENDER_GLOBALS,
+                    current,
+                    other._render_globals,
+                )
+                if _changed(a, b)
+            )
+            if render_globals:
+                changes['RenderGlobals'] = render_globals
+
+        current_extra = dict(self._extra)
+        for key, value in other._extra:
+            if key not in current_extra or current_extra[key] != value:
+                section, extra_key = key
+                if section == 'RenderGlobals':
+                    continue
+                if section is None:
+                    changes[extra_key] = thaw(value)
+                else:
+                    changes.setdefault(section, {})[extra_key] = thaw(value)
+
+        return changes
+
+    def merge(self, other):
+        '''Create a new state with the properties of other applied on top
+        of this state.
+
+        :param other: ViewportState or dict
+        '''
+
+        other = ViewportState(other)
+
+        values = [
+            a if b is MISSING else b
+            for a, b in zip(self._values, other._values)
+        ]
+
+        if other._render_globals is None:
+            render_globals = self._render_globals
+        elif self._render_globals is None:
+            render_globals = other._render_globals
+        else:
+            render_globals = [
+                a if b is MISSING else b
+                for a, b in zip(self._render_globals, other._render_globals)
+            ]
+
+        extra = dict(self._extra)
+        extra.update(dict(other._extra))
+
+        return self._from_parts(values, render_globals, extra.items())
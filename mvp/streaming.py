@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+'''
+Encode movies while frames are being captured.
+
+Frames are captured in small chunks and piped to an external encoder
+process by a writer thread, so encoding overlaps capture instead of
+running after it. The queue between capture and the writer is bounded, so
+capture waits when the encoder falls behind.
+
+The encoder command is pluggable, either per call or through
+ENCODER_COMMAND. It receives png frames on stdin::
+
+    streaming.ENCODER_COMMAND = [
+        'python', 'fake_encoder.py', '{output}', '{fps}'
+    ]
+'''
+
+import os
+import shutil
+import tempfile
+import threading
+import subprocess
+
+try:
+    import queue
+except ImportError:  # Py2 compat
+    import Queue as queue
+
+import maya.cmds as cmds
+
+from .utils import frame_path, viewport_state
+
+
+# Command used to launch the encoder. None uses get_encoder_command.
+ENCODER_COMMAND = None
+ENCODER_EXECUTABLE = os.environ.get('MVP_FFMPEG', 'ffmpeg')
+
+
+def get_sound_file(sound):
+    '''Get the audio file of a Maya audio node.'''
+
+    if sound and cmds.objExists(sound):
+        return cmds.getAttr(sound + '.filename')
+
+
+def get_encoder_command(output, fps, sound_file=None):
+    '''Default encoder command, an ffmpeg reading pngs from stdin.'''
+
+    command = [
+        ENCODER_EXECUTABLE,
+        '-y',
+        '-loglevel', 'error',
+        '-f', 'image2pipe',
+        '-framerate', str(fps),
+        '-i', '-',
+    ]
+    if sound_file:
+        command.extend(['-i', sound_file, '-c:a', 'aac', '-shortest'])
+    command.extend([
+        '-c:v', 'libx264',
+        '-pix_fmt', 'yuv420p',
+        output,
+    ])
+    return command
+
+
+def build_command(command, output, fps, sound_file=None):
+    '''Build an encoder command.
+
+    :param command: Callable taking output, fps and sound_file, or a list
+        of arguments where {output}, {fps} and {sound} are replaced. None
+        uses ENCODER_COMMAND and falls back to get_encoder_command.
+    '''
+
+    command = command or ENCODER_COMMAND or get_encoder_command
+    if callable(command):
+        return command(output, fps, sound_file)
+
+    return [
+        arg.format(output=output, fps=fps, sound=sound_file or '')
+        for arg in command
+    ]
+
+
+class FrameWriter(threading.Thread):
+    '''Write captured frames to the stdin of an encoder process.
+
+    :param process: Encoder subprocess.Popen with stdin=PIPE
+    :param max_frames: Number of captured frames allowed to wait for the
+        encoder before capture blocks
+    '''
+
+    def __init__(self, process, max_frames=16):
+        super(FrameWriter, self).__init__()
+        self.daemon = True
+        self.process = process
+        self.frames = queue.Queue(maxsize=max_frames)
+        self.error = None
+
+    def put(self, path):
+        '''Queue a frame, blocks while the queue is full.'''
+
+        if self.error:
+            raise self.error
+        self.frames.put(path)
+
+    def close(self):
+        '''Signal the last frame and wait for the encoder to finish.
+
+        :returns: The encoder's return code
+        '''
+
+        self.frames.put(None)
+        self.join()
+        returncode = self.process.wait()
+        if self.error:
+            raise self.error
+        return returncode
+
+    def abort(self):
+        '''Kill the encoder without finishing the movie and wait for the
+        writer to stop.'''
+
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+        self.frames.put(None)
+        self.join()
+        self.process.wait()
+
+    def run(self):
+        try:
+            while True:
+                path = self.frames.get()
+                if path is None:
+                    break
+
+                if self.error:
+                    # Keep draining so capture never blocks forever
+                    continue
+
+                with open(path, 'rb') as f:
+                    self.process.stdin.write(f.read())
+                os.remove(path)
+        except (IOError, OSError) as e:
+            self.error = e
+            while self.frames.get() is not None:
+                pass
+        finally:
+            try:
+                self.process.stdin.close()
+            except (IOError, OSError):
+                pass
+
+
+def streaming_playblast(filename, start, end, fps, camera=None, state=None,
+                        width=960, height=540, sound=None, chunk_size=8,
+                        max_frames=16, command=None, padding=4):
+    '''Capture frames and encode them into a movie at the same time.
+
+    Arguments:
+        :param filename: Movie to write
+        :param start: First frame
+        :param end: Last frame
+        :param fps: Frames per second
+        :param camera: Camera to capture
+        :param state: Viewport state
+        :param width: Resolution width
+        :param height: Resolution height
+        :param sound: Maya audio node to add to the movie
+        :param chunk_size: Frames captured per playblast call
+        :param max_frames: Frames allowed to wait for the encoder
+        :param command: Encoder command, see build_command
+
+    :returns: filename
+    '''
+
+    from .viewport import Viewport, playblast
+
+    output_dir = os.path.dirname(filename)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    process = subprocess.Popen(
+        build_command(command, filename, fps, get_sound_file(sound)),
+        stdin=subprocess.PIPE,
+    )
+    writer = FrameWriter(process, max_frames)
+    writer.start()
+
+    state = dict(state or {})
+    if camera:
+        state['camera'] = camera
+
+    tmp_dir = tempfile.mkdtemp(prefix='mvp_streaming_')
+    prefix = os.path.join(tmp_dir, 'frame')
+    try:
+        # Apply the viewport state once for all chunks
+        with viewport_state(Viewport.active(), state):
+            start, end = int(start), int(end)
+            for chunk_start in range(start, end + 1, chunk_size):
+                chunk_end = min(chunk_start + chunk_size - 1, end)
+                playblast(
+                    state=state,
+                    format='image',
+                    compression='png',
+                    filename=prefix,
+                    startTime=chunk_start,
+                    endTime=chunk_end,
+                    width=width,
+                    height=height,
+                    framePadding=padding,
+                )
+                for frame in range(chunk_start, chunk_end + 1):
+                    writer.put(frame_path(prefix, frame, padding))
+        returncode = writer.close()
+    except Exception:
+        # Keep the capture error, the movie would only be partial
+        writer.abort()
+        raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if returncode != 0:
+        raise RuntimeError('Encoder exited with code %s' % returncode)
+
+    return filename
@@ -61,6 +61,10 @@ class PlayblastForm(Form):
         default=(960, 540),
         validators=(check_resolution,),
     )
+    stage_locally = BoolField(
+        'Stage Locally',
+        default=False,
+    )
 
     postrender = PostRenderForm()
 
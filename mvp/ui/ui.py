@@ -1,16 +1,32 @@
 # -*- coding: utf-8 -*-
 
+from __future__ import print_function
+
 import os
 import json
+import time
 from functools import partial
 
+try:
+    from concurrent import futures
+except ImportError:  # Py2 compat, requires the futures backport
+    futures = None
+
 from maya import cmds, mel
 
 from .forms import PlayblastForm, NewPresetForm, DelPresetForm
 from .. import hooks, resources
+from ..executor import run_postrenders
 from ..renderlayers import enabled_render_layers
 from ..viewport import playblast, Viewport
-from ..utils import get_maya_window
+from ..staging import get_staging_path, get_final_path, submit_transfer
+from ..utils import (
+    get_maya_window,
+    viewport_state,
+    call_in_main_thread,
+    require_futures,
+    when_done,
+)
 from ..presets import *
 from ..vendor.psforms import controls
 from ..vendor.psforms.widgets import FormGroup, FormWidget, IconButton
@@ -197,7 +213,7 @@ def del_preset_dialog(parent_dialog):
 
 def update_presets(dialog, name=None):
 
-    presets = ['Current Settings'] + sorted([n for n, s in get_presets()])
+    presets = ['Current Settings'] + get_preset_names()
     dialog.preset.set_options(presets)
     if name:
         dialog.preset.set_value(name)
@@ -210,6 +226,9 @@ class PlayblastDialog(object):
             frameless=False,
             parent=get_maya_window(),
         )
+        self.postrender_jobs = []
+        self.postrender_futures = []
+        self.transfers = []
         self.setup_controls()
         self.setup_connections()
         self.restore_form_state()
@@ -461,12 +480,59 @@ class PlayblastDialog(object):
 
         Viewport.active().identify()
 
+    def run_integration(self, integration, method, data):
+        '''Run an integration lifecycle method. Methods returning futures
+        or running as background jobs report when they finish.'''
+
+        result = integration.run(method, integration.form, data)
+        if hasattr(result, 'add_done_callback'):
+            result.add_done_callback(partial(
+                self.on_integration_done,
+                integration.name or type(integration).__name__,
+                method,
+            ))
+        return result
+
+    def on_integration_done(self, name, method, future):
+        '''Report a finished background integration method. Called from
+        worker threads.'''
+
+        if future.cancelled():
+            print('mvp: %s %s cancelled' % (name, method))
+        elif future.exception() is not None:
+            print('mvp: %s %s failed: %s' % (name, method, future.exception()))
+        else:
+            print('mvp: %s %s done' % (name, method))
+
+    def on_postrender_progress(self, job, name, future):
+        '''Report postrender progress. Called from worker threads.'''
+
+        if future.cancelled():
+            status = 'cancelled'
+        elif future.exception() is not None:
+            status = 'failed: %s' % future.exception()
+        else:
+            status = 'done'
+        print('mvp: postrender %s %s (%d%%) %s' % (
+            name,
+            status,
+            job.progress() * 100,
+            job.filename,
+        ))
+
     def on_accept(self):
         '''When form is accepted - parse options and capture'''
 
         self.store_form_state()
         data = self.form.get_value()
 
+        # Forget finished postrender jobs
+        self.postrender_jobs = [
+            job for job in self.postrender_jobs if not job.done()
+        ]
+        self.postrender_futures = []
+        self.transfers = []
+
         # Prepare to render
         if data['preset'] == 'Current Settings':
             state = Viewport.active().get_state()
@@ -478,32 +544,65 @@ class PlayblastDialog(object):
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        renders = []
-        if data['render_layers'] == 'current':
-            renders.append(self._render(state, data))
+        # Scene data is the same for every render layer
+        if data['capture_mode'] == 'snapshot':
+            data['start_frame'] = cmds.currentTime(q=True)
+            data['end_frame'] = data['start_frame']
         else:
-            with enabled_render_layers() as layers:
-                for layer in layers:
-                    # Copy data and add layer name to filename
-                    render_data = data.copy()
-                    base, ext = render_data['filename'].rsplit('.', 1)
-                    layer_name = '{}_{}.{}'.format(base, layer.name(), ext)
-                    render_data['filename'] = layer_name
-
-                    layer.switchToLayer()
-                    renders.append(self._render(state, render_data))
-
-        # Finalize
+            data['start_frame'], data['end_frame'] = get_framerange()
+            data['fps'] = get_fps()
+            data['sound'] = get_sound_track()
+
+        # Apply the viewport state once for all captures
+        session_state = dict(state)
+        session_state['camera'] = data['camera']
+
+        renders = []
+        with viewport_state(Viewport.active(), session_state):
+            if data['render_layers'] == 'current':
+                renders.append(self._render(state, data))
+            else:
+                with enabled_render_layers() as layers:
+                    for layer in layers:
+                        # Copy data and add layer name to filename
+                        render_data = data.copy()
+                        base, ext = render_data['filename'].rsplit('.', 1)
+                        layer_name = '{}_{}.{}'.format(base, layer.name(), ext)
+                        render_data['filename'] = layer_name
+
+                        start = time.time()
+                        layer.switchToLayer()
+                        render_data['switch_time'] = time.time() - start
+                        renders.append(self._render(state, render_data))
+
+        for render in renders:
+            print('mvp: captured %s in %.2fs (layer switch %.2fs)' % (
+                render['filename'],
+                render['capture_time'],
+                render.get('switch_time', 0),
+            ))
+
+        # Finalize once postrenders are done and staged renders are
+        # transferred
+        when_done(self.postrender_futures + self.transfers, partial(
+            call_in_main_thread,
+            self.finalize,
+            renders,
+        ))
+
+    def finalize(self, renders):
         for name, integration in self.integrations.items():
             if integration.enabled:
-                integration.finalize(integration.form, renders)
+                self.run_integration(integration, 'finalize', renders)
 
     def _render(self, state, data):
 
+        start = time.time()
+
         # Execute integration before_playblast
         for name, integration in self.integrations.items():
             if integration.enabled:
-                integration.before_playblast(integration.form, data)
+                self.run_integration(integration, 'before_playblast', data)
 
         # Prepare resolution
         if data.pop('half_res', False):
@@ -512,10 +611,17 @@ class PlayblastDialog(object):
                 round_to_even(data['resolution'][1] * 0.5),
             )
 
+        # Capture to local disk and transfer to filename afterwards
+        filename = data['filename']
+        staging = data.get('stage_locally')
+        if staging:
+            data['filename'] = get_staging_path(filename)
+            staging_dir = os.path.dirname(data['filename'])
+            if not os.path.exists(staging_dir):
+                os.makedirs(staging_dir)
+
         if data['capture_mode'] == 'snapshot':
             # Render snapshot
-            data['start_frame'] = cmds.currentTime(q=True)
-            data['end_frame'] = data['start_frame']
             out_file = playblast(
                 camera=data['camera'],
                 state=state,
@@ -529,11 +635,6 @@ class PlayblastDialog(object):
         else:
             # Call extension handler
             extension = hooks.extension.get(data['ext_option'])
-            framerange = get_framerange()
-            data['start_frame'] = framerange[0]
-            data['end_frame'] = framerange[1]
-            data['fps'] = get_fps()
-            data['sound'] = get_sound_track()
             out_file = extension.handler(
                 data=dict(
                     state=state,
@@ -549,22 +650,111 @@ class PlayblastDialog(object):
                 options=extension.options or {},
             )
 
-        # Execute postrender callbacks
-        if 'postrender' in data:
-            for name, enabled in data['postrender'].items():
-                if enabled:
-                    postrender = hooks.postrender.get(name)
-                    postrender.handler(data['filename'])
+        postrender_filename = data['filename']
 
         # Update filename from playblast command
         data['filename'] = out_file
+        data['capture_time'] = time.time() - start
+
+        transfers = []
+        if staging:
+            # Report the final location, postrenders and integrations run
+            # once the transfer is done
+            transfer = submit_transfer(
+                out_file,
+                filename,
+                start=data['start_frame'],
+                end=data['end_frame'],
+            )
+            transfer.add_done_callback(partial(
+                self.on_transfer_done,
+                out_file,
+            ))
+            transfers.append(transfer)
+            self.transfers.append(transfer)
+            postrender_filename = get_final_path(postrender_filename, filename)
+            data['filename'] = get_final_path(out_file, filename)
+
+        # Execute postrender callbacks in the background
+        postrenders = [
+            name for name, enabled in data.get('postrender', {}).items()
+            if enabled
+        ]
+        postrender_futures = []
+        if postrenders:
+            postrender_futures.append(self.start_postrenders(
+                postrenders,
+                postrender_filename,
+                sequence=data['filename'],
+                start=data['start_frame'],
+                end=data['end_frame'],
+                after=transfers,
+            ))
+            self.postrender_futures.extend(postrender_futures)
 
-        # Execute integration after_playblast
+        # Execute integration after_playblast once postrenders are done
+        # and the output is transferred
+        when_done(postrender_futures + transfers, partial(
+            call_in_main_thread,
+            self.after_playblast,
+            data,
+        ))
+
+        return data
+
+    def start_postrenders(self, names, filename, sequence, start, end,
+                          after=()):
+        '''Run postrender hooks once the futures in after succeeded, like
+        the transfer of a staged capture. Hooks are skipped when one of
+        them failed.
+
+        :returns: Future resolving to the PostRenderJob once all hooks are
+            done, or to None when the hooks were skipped
+        '''
+
+        require_futures()
+        done = futures.Future()
+
+        def run():
+            for future in after:
+                if future.cancelled() or future.exception() is not None:
+                    done.set_result(None)
+                    return
+            try:
+                job = run_postrenders(
+                    names,
+                    filename,
+                    sequence=sequence,
+                    start=start,
+                    end=end,
+                    callback=self.on_postrender_progress,
+                )
+            except Exception as e:
+                done.set_exception(e)
+                return
+            self.postrender_jobs.append(job)
+            when_done(job.futures.values(), partial(done.set_result, job))
+
+        when_done(after, partial(call_in_main_thread, run))
+        return done
+
+    def after_playblast(self, data):
         for name, integration in self.integrations.items():
             if integration.enabled:
-                integration.after_playblast(integration.form, data)
+                self.run_integration(integration, 'after_playblast', data)
 
-        return data
+    def on_transfer_done(self, staged, future):
+        '''Report a finished transfer. Called from worker threads.'''
+
+        if future.cancelled():
+            print('mvp: transfer of %s cancelled' % staged)
+        elif future.exception() is not None:
+            print('mvp: transfer of %s failed: %s' % (
+                staged,
+                future.exception(),
+            ))
+        else:
+            print('mvp: transferred %s to %s' % (staged, future.result()))
 
 
 def round_to_even(value):
@@ -574,6 +764,7 @@ def round_to_even(value):
 def show():
     '''Main playblast form.'''
 
+    hooks.ensure_init()
     PlayblastDialog._instance = PlayblastDialog()
     PlayblastDialog._instance.show()
     return PlayblastDialog._instance
@@ -1,9 +1,56 @@
 # -*- coding: utf-8 -*-
 
+import os
+import re
+import sys
+import json
 import time
+import threading
+from collections import deque
 from contextlib import contextmanager
 
-from .vendor.Qt import QtWidgets
+import maya.cmds as cmds
+
+from .state import CAMERA_PROPERTIES, values_equal
+
+
+_pending_edits = []
+_batch_depth = [0]
+_applied_states = {}
+_main_calls = deque()
+_main_lock = threading.Lock()
+_main_tick = [False]
+_batch = []
+
+# Seconds a main thread tick may spend on queued calls before the rest are
+# deferred to the next tick
+MAIN_THREAD_BUDGET = 0.05
+
+
+def is_batch():
+    '''True when Maya runs without ui, like in mayapy.
+
+    Queried once on the main thread, see config.ensure_init. Worker
+    threads read the cached value and never call Maya. Before it is
+    cached they check which startup module Maya imported.
+    '''
+
+    if not _batch:
+        if not is_main_thread():
+            return 'maya.app.startup.gui' not in sys.modules
+        _batch.append(bool(cmds.about(batch=True)))
+    return _batch[0]
+
+
+def get_qapp():
+    '''Get the QApplication instance or None. Qt is not imported in batch
+    mode, like in mayapy.'''
+
+    if is_batch():
+        return None
+
+    from .vendor.Qt import QtWidgets
+    return QtWidgets.QApplication.instance()
 
 
 def get_maya_window(cache=[]):
@@ -12,7 +59,7 @@ def get_maya_window(cache=[]):
     if cache:
         return cache[0]
 
-    for widget in QtWidgets.QApplication.instance().topLevelWidgets():
+    for widget in get_qapp().topLevelWidgets():
         if widget.objectName() == 'MayaWindow':
             cache.append(widget)
             return widget
@@ -23,7 +70,7 @@ def get_maya_window(cache=[]):
 def wait(delay=1):
     '''Delay python execution for a specified amount of time'''
 
-    app = QtWidgets.QApplication.instance()
+    app = get_qapp()
 
     s = time.clock()
     while True:
@@ -33,10 +80,89 @@ def wait(delay=1):
         app.processEvents()
 
 
+def diff_values(current, state):
+    '''Returns the items in state whose values differ from current.'''
+
+    return dict(
+        (k, v) for k, v in state.items()
+        if k not in current or not values_equal(current[k], v)
+    )
+
+
+@contextmanager
+def batch_edits():
+    '''Hold Viewport and RenderGlobals edits for the duration of the context.
+    On exit the edits are applied together with refresh suspended, followed
+    by a single forced refresh. Nested batches are applied when the
+    outermost batch exits.
+
+    Example:
+
+        with batch_edits():
+            viewport.nurbsCurves = False
+            viewport.polymeshes = True
+            RenderGlobals.ssaoEnable = True
+    '''
+
+    _batch_depth[0] += 1
+    try:
+        yield
+    finally:
+        _batch_depth[0] -= 1
+        if not _batch_depth[0]:
+            flush_edits()
+
+
+def defer_edit(fn, *args, **kwargs):
+    '''Queue an edit when a batch is active.
+
+    :returns: True if the edit was deferred, False if fn should be called
+        immediately.
+    '''
+
+    if not _batch_depth[0]:
+        return False
+
+    _pending_edits.append((fn, args, kwargs))
+    return True
+
+
+def flush_edits():
+    '''Apply all pending edits now.'''
+
+    edits = _pending_edits[:]
+    del _pending_edits[:]
+    if not edits:
+        return
+
+    interactive = not is_batch()
+    depth = _batch_depth[0]
+    _batch_depth[0] = 0
+    if interactive:
+        cmds.refresh(suspend=True)
+    try:
+        for fn, args, kwargs in edits:
+            fn(*args, **kwargs)
+    finally:
+        _batch_depth[0] = depth
+        if interactive:
+            cmds.refresh(suspend=False)
+            cmds.refresh(force=True)
+
+
 @contextmanager
 def viewport_state(viewport, state):
     '''Sets a viewports state options for the duration of the context.
 
+    Only the properties that differ from the viewport's current state are
+    set, and only those are restored when the context exits. Both steps are
+    applied as a batch, see :func:`batch_edits`.
+
+    When nested in another viewport_state for the same viewport, the state
+    applied by the outer context is used as the current state instead of
+    querying the viewport again. This lets a capture session apply a state
+    once and run many playblasts without any redundant viewport edits.
+
     Example:
 
         # Turn off the display of nurbsCurves
@@ -48,9 +174,237 @@ def viewport_state(viewport, state):
             # Do something with nurbsCurves off
     '''
 
-    previous_state = viewport.get_state()
+    if not state:
+        yield
+        return
+
+    panel = viewport.panel
+    outer_state = _applied_states.get(panel)
+    if outer_state is None:
+        current_state = viewport.get_state()
+    else:
+        # Nested in another viewport_state, reuse its snapshot and only
+        # refresh the cached render globals which render layers may change
+        from .renderglobals import RenderGlobals
+        current_state = dict(outer_state)
+        current_state['RenderGlobals'] = RenderGlobals.get_state()
+
+    changes = viewport.diff_state(state, current_state)
+    restore = viewport.select_state(current_state, changes)
+
+    # Camera properties are set on the new camera, snapshot its own values
+    # to restore them instead of the previous camera's
+    camera_restore = {}
+    if 'camera' in changes:
+        from .camera import get_camera_state
+        camera_state = get_camera_state(changes['camera'])
+        for k in CAMERA_PROPERTIES:
+            if k in changes:
+                camera_restore[k] = camera_state[k]
+                restore.pop(k, None)
+
+    applied_state = dict(current_state)
+    applied_state.update(
+        (k, v) for k, v in changes.items() if k != 'RenderGlobals'
+    )
     try:
-        viewport.set_state(state)
+        with batch_edits():
+            viewport.set_state(changes)
+            flush_edits()
+        _applied_states[panel] = applied_state
         yield
     finally:
-        viewport.set_state(previous_state)
+        if outer_state is None:
+            _applied_states.pop(panel, None)
+        else:
+            _applied_states[panel] = outer_state
+        with batch_edits():
+            if camera_restore:
+                from .camera import set_camera_state
+                set_camera_state(changes['camera'], camera_restore)
+            viewport.set_state(restore)
+
+
+def is_main_thread():
+    '''True when called from Maya's main thread.'''
+
+    return isinstance(threading.current_thread(), threading._MainThread)
+
+
+def _resolve(future, fn, args, kwargs):
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+
+
+def _run_main_calls():
+    '''Run queued calls in a single main thread tick.'''
+
+    start = time.time()
+    while True:
+        with _main_lock:
+            if not _main_calls:
+                _main_tick[0] = False
+                return
+            if time.time() - start > MAIN_THREAD_BUDGET:
+                # Give Maya a chance to process events
+                _schedule_main_calls()
+                return
+            future, fn, args, kwargs = _main_calls.popleft()
+        _resolve(future, fn, args, kwargs)
+
+
+def _schedule_main_calls():
+    import maya.utils
+    maya.utils.executeDeferred(_run_main_calls)
+
+
+def call_in_main_thread(fn, *args, **kwargs):
+    '''Call fn on Maya's main thread and return a Future.
+
+    Calls made from the main thread run immediately. Calls from worker
+    threads are queued and all queued calls run together in one main
+    thread tick. Do not wait on the Future from the main thread.
+
+    Example:
+
+        def worker():
+            future = call_in_main_thread(cmds.currentTime, query=True)
+            frame = future.result()
+    '''
+
+    require_futures()
+    from concurrent.futures import Future
+
+    future = Future()
+    if is_main_thread():
+        _resolve(future, fn, args, kwargs)
+        return future
+
+    with _main_lock:
+        _main_calls.append((future, fn, args, kwargs))
+        if _main_tick[0]:
+            return future
+        _main_tick[0] = True
+
+    if is_batch():
+        # No event loop in batch mode, deferred calls would never run
+        _run_main_calls()
+    else:
+        _schedule_main_calls()
+    return future
+
+
+def call_batch_in_main_thread(calls):
+    '''Run many calls together on Maya's main thread.
+
+    Edits made by the calls are batched, see :func:`batch_edits`.
+
+    :param calls: List of (fn, args, kwargs) tuples
+    :returns: Future with a list of results
+    '''
+
+    def run_calls():
+        with batch_edits():
+            return [fn(*args, **kwargs) for fn, args, kwargs in calls]
+
+    return call_in_main_thread(run_calls)
+
+
+def main_thread(fn):
+    '''Decorator making fn run on Maya's main thread. Calls from worker
+    threads block until fn returns.'''
+
+    def wrapper(*args, **kwargs):
+        if is_main_thread():
+            return fn(*args, **kwargs)
+        return call_in_main_thread(fn, *args, **kwargs).result()
+
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+
+def require_futures():
+    '''Raise a RuntimeError when concurrent.futures is missing. Python 2
+    requires the futures backport.'''
+
+    try:
+        import concurrent.futures
+    except ImportError:
+        raise RuntimeError(
+            'mvp requires the futures package on Python 2, '
+            'install it with: pip install futures'
+        )
+
+
+def when_done(fs, fn):
+    '''Call fn once all futures are done.'''
+
+    fs = list(fs)
+    if not fs:
+        fn()
+        return
+
+    remaining = [len(fs)]
+    lock = threading.Lock()
+
+    def on_done(future):
+        with lock:
+            remaining[0] -= 1
+            ready = remaining[0] == 0
+        if ready:
+            fn()
+
+    for future in fs:
+        future.add_done_callback(on_done)
+
+
+def replace_file(src, dst):
+    '''Move src to dst in one step, replacing dst. Readers see either the
+    old or the new file, never no file.'''
+
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # Py2 compat
+        if sys.platform == 'win32' and os.path.exists(dst):
+            # Py2 on windows can not rename over an existing file
+            os.remove(dst)
+        os.rename(src, dst)
+
+
+def write_json(path, data):
+    '''Write json to a temporary file then move it in place, so a crash
+    never leaves a partial or missing file behind.'''
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(data, indent=4, sort_keys=True))
+    replace_file(tmp_path, path)
+
+
+def frame_path(prefix, frame, padding=4):
+    '''Path of a frame in an image sequence.'''
+
+    return '%s.%s.png' % (prefix, str(int(frame)).zfill(padding))
+
+
+def expand_frames(filename, start, end):
+    '''Get the frame paths of an image sequence like name.####.png.
+
+    Returns [filename] when filename is not an image sequence.
+    '''
+
+    match = re.search(r'#+', filename)
+    if not match or start is None or end is None:
+        return [filename]
+
+    padding = len(match.group(0))
+    return [
+        filename[:match.start()] + str(frame).zfill(padding)
+        + filename[match.end():]
+        for frame in range(int(start), int(end) + 1)
+    ]
@@ -4,13 +4,19 @@ from __future__ import print_function, absolute_import
 import sys
 
 import maya.cmds as cmds
+import maya.mel as mel
 import maya.OpenMayaUI as OpenMayaUI
 import maya.OpenMaya as OpenMaya
 import maya.utils as utils
-from Qt import QtGui, QtCore, QtWidgets
 
+from . import capabilities
+from .applier import apply_preset, get_state_applier
+from .camera import get_camera_plugs, get_camera_state
 from .renderglobals import RenderGlobals
-from .utils import wait, viewport_state, get_maya_window
+from .state import EDITOR_PROPERTIES, CAMERA_PROPERTIES, ViewportState
+from .utils import (
+    wait, viewport_state, batch_edits, defer_edit,
+)
 
 # Py3 compat
 if sys.version_info > (3, 0):
@@ -18,113 +24,34 @@ if sys.version_info > (3, 0):
     long = int
 
 
-EDITOR_PROPERTIES = [
-    'activeComponentsXray',
-    'activeOnly',
-    'backfaceCulling',
-    'bufferMode',
-    'bumpResolution',
-    'camera',
-    'cameras',
-    'clipGhosts',
-    'colorResolution',
-    'controllers',
-    'controlVertices',
-    'cullingOverride',
-    'deformers',
-    'depthOfField',
-    'dimensions',
-    'displayAppearance',
-    'displayLights',
-    'displayTextures',
-    'dynamicConstraints',
-    'dynamics',
-    'fluids',
-    'fogColor',
-    'fogDensity',
-    'fogEnd',
-    'fogging',
-    'fogMode',
-    'fogSource',
-    'fogStart',
-    'follicles',
-    'gpuCacheDisplayFilter',
-    'greasePencils',
-    'grid',
-    'hairSystems',
-    'handles',
-    'headsUpDisplay',
-    'hulls',
-    'ignorePanZoom',
-    'ikHandles',
-    'imagePlane',
-    'interactiveBackFaceCull',
-    'interactiveDisableShadows',
-    'isFiltered',
-    'joints',
-    'jointXray',
-    'lights',
-    'lineWidth',
-    'locators',
-    'lowQualityLighting',
-    'manipulators',
-    'maxConstantTransparency',
-    'maximumNumHardwareLights',
-    'motionTrails',
-    'nCloths',
-    'nParticles',
-    'nRigids',
-    'nurbsCurves',
-    'nurbsSurfaces',
-    'objectFilterShowInHUD',
-    'occlusionCulling',
-    'particleInstancers',
-    'pivots',
-    'planes',
-    'pluginShapes',
-    'polymeshes',
-    'rendererName',
-    'selectionHiliteDisplay',
-    'shadingModel',
-    'shadows',
-    'smallObjectCulling',
-    'smallObjectThreshold',
-    'smoothWireframe',
-    'sortTransparent',
-    'strokes',
-    'subdivSurfaces',
-    'textureAnisotropic',
-    'textureCompression',
-    'textureDisplay',
-    'textureHilight',
-    'textureMaxSize',
-    'textures',
-    'textureSampling',
-    'transparencyAlgorithm',
-    'transpInShadows',
-    'twoSidedLighting',
-    'useBaseRenderer',
-    'useDefaultMaterial',
-    'useInteractiveMode',
-    'useReducedRenderer',
-    'viewSelected',
-    'wireframeOnShaded',
-    'xray',
-]
-
-CAMERA_PROPERTIES = [
-    'displayFilmGate',
-    'displayResolution',
-    'displayGateMask',
-    'displayFieldChart',
-    'displaySafeAction',
-    'displaySafeTitle',
-    'displayFilmPivot',
-    'displayFilmOrigin',
-    'overscan',
-    'displayGateMaskOpacity',
-    'displayGateMaskColor'
-]
+# MEL return types of modelEditor query flags, anything missing is a boolean
+EDITOR_PROPERTY_TYPES = {
+    'bufferMode': 'string',
+    'bumpResolution': 'int',
+    'camera': 'string',
+    'colorResolution': 'int',
+    'cullingOverride': 'string',
+    'displayAppearance': 'string',
+    'displayLights': 'string',
+    'fogColor': 'float[]',
+    'fogDensity': 'float',
+    'fogEnd': 'float',
+    'fogMode': 'string',
+    'fogSource': 'string',
+    'fogStart': 'float',
+    'lineWidth': 'float',
+    'maxConstantTransparency': 'float',
+    'rendererName': 'string',
+    'shadingModel': 'int',
+    'smallObjectThreshold': 'float[]',
+    'textureDisplay': 'string',
+    'textureMaxSize': 'int',
+    'textureSampling': 'int',
+    'transparencyAlgorithm': 'string',
+}
+
+# Marks a property the batched query could not read
+QUERY_ERROR = '<mvp:error>'
 
 
 def deferred_close(view):
@@ -163,7 +90,7 @@ def playblast(camera=None, state=None, **kwargs):
     playblast_kwargs.update(kwargs)
 
     active = Viewport.active()
-    state = state or active.get_state()
+    state = dict(state or {})
 
     if camera:
         state['camera'] = camera
@@ -184,35 +111,37 @@ class EditorProperty(object):
         if not inst:
             return self
 
-        try:
-            val = cmds.modelEditor(
-                inst.panel,
-                **{'query': True, self.name: True}
-            )
-        except TypeError:
-            val = cmds.modelEditor(
-                inst.panel,
-                **{'query': True, 'qpo': self.name}
+        panel = inst.panel
+        capability = capabilities.get(panel, self.name)
+
+        if capability.mode == capabilities.FLAG:
+            val = cmds.modelEditor(panel, **{'query': True, self.name: True})
+        elif capability.mode == capabilities.PLUGIN_OBJECT:
+            val = cmds.modelEditor(panel, query=True, qpo=self.name)
+        else:
+            raise AttributeError(
+                'modelEditor property %s is not supported.' % self.name
             )
 
-        if self.name == 'smallObjectThreshold':
+        if capability.unwrap:
             val = val[0]
 
         return val
 
     def __set__(self, inst, value):
-        '''Sets a model editor property.'''
+        '''Sets a model editor property. Unsupported properties are ignored
+        so presets from other Maya versions can still be applied.'''
 
-        try:
-            cmds.modelEditor(
-                inst.panel,
-                **{'edit': True, self.name: value}
-            )
-        except TypeError:
-            cmds.modelEditor(
-                inst.panel,
-                **{'edit': True, 'po': [self.name, value]}
-            )
+        if defer_edit(self.__set__, inst, value):
+            return
+
+        panel = inst.panel
+        capability = capabilities.get(panel, self.name)
+
+        if capability.mode == capabilities.FLAG:
+            cmds.modelEditor(panel, **{'edit': True, self.name: value})
+        elif capability.mode == capabilities.PLUGIN_OBJECT:
+            cmds.modelEditor(panel, edit=True, po=[self.name, value])
 
 
 class CameraProperty(object):
@@ -226,38 +155,325 @@ class CameraProperty(object):
         if not inst:
             return self
 
-        attr = inst.camera + '.' + self.name
-        value = cmds.getAttr(attr)
-        if isinstance(value, list):
-            if len(value) == 1 and isinstance(value[0], (list, tuple)):
-                value = value[0]
-        return value
+        return get_camera_plugs(inst.camera).get(self.name)
 
     def __set__(self, inst, value):
         '''Sets a model panels camera property'''
 
-        attr = inst.camera + '.' + self.name
+        if defer_edit(self.__set__, inst, value):
+            return
+
+        get_camera_plugs(inst.camera).set_state({self.name: value})
+
+
+MEL_QUERY_VARIABLES = {
+    'bool': '$i',
+    'int': '$i',
+    'float': '$f',
+    'string': '$s',
+    'float[]': '$fa',
+}
+
+
+def _mel_query(command, typ):
+    '''Returns MEL appending the result of command to $result. When the
+    command fails QUERY_ERROR is appended instead.'''
+
+    var = MEL_QUERY_VARIABLES[typ]
+    if typ == 'float[]':
+        value = 'mvpFloatsToString(%s)' % var
+    else:
+        value = var
+
+    return (
+        'if (!catchQuiet(%s = `%s`)) $result[size($result)] = %s;\n'
+        '    else $result[size($result)] = "%s";'
+    ) % (var, command, value, QUERY_ERROR)
+
+
+def _mel_query_source(editor_capabilities):
+    '''Generate MEL procs that query all supported editor properties and
+    return them as a newline separated string.
+
+    :param editor_capabilities: Dict mapping editor properties to
+        capabilities.Capability
+    '''
+
+    queries = []
+    for name in EDITOR_PROPERTIES:
+        capability = editor_capabilities.get(name)
+        if not capability:
+            continue
+
+        if capability.mode == capabilities.FLAG:
+            command = 'modelEditor -q -%s $panel' % name
+        elif capability.mode == capabilities.PLUGIN_OBJECT:
+            command = 'modelEditor -q -qpo "%s" $panel' % name
+        else:
+            continue
+
+        queries.append(_mel_query(
+            command,
+            EDITOR_PROPERTY_TYPES.get(name, 'bool'),
+        ))
+
+    return '''
+global proc string mvpFloatsToString(float $values[])
+{
+    string $s = "";
+    float $v;
+    for ($v in $values)
+        $s += ($v + " ");
+    return $s;
+}
+
+global proc string mvpQueryState(string $panel)
+{
+    string $result[];
+    int $i;
+    float $f;
+    string $s;
+    float $fa[];
+    %s
+    return stringArrayToString($result, "\\n");
+}
+''' % '\n    '.join(queries)
+
+
+def _decode_query(value, typ):
+    '''Convert a value returned by mvpQueryState to a python value.'''
+
+    if typ == 'bool':
+        return bool(int(value))
+    if typ == 'int':
+        return int(value)
+    if typ == 'float':
+        return float(value)
+    if typ == 'float[]':
+        return [float(v) for v in value.split()]
+    return value
+
+
+def query_state(view, _source=[]):
+    '''Query all editor properties of a Viewport using a single MEL
+    evaluation and all camera properties through plugs. Editor properties
+    the batched query fails to read fall back to the EditorProperty
+    descriptors. Editor properties that are unsupported by this version of
+    Maya, or whose plugin is not loaded, are omitted.
+
+    :param view: Viewport to query
+    :returns: Dict containing property, value pairs
+    '''
+
+    panel = view.panel
+    editor_properties = [p for p in EDITOR_PROPERTIES if p != 'camera']
+    editor_capabilities = capabilities.probe(panel, editor_properties)
+
+    # Rebuild the MEL procs whenever the capabilities they were built
+    # from change, otherwise their results do not line up with the loop
+    key = tuple(
+        (name, editor_capabilities[name].mode) for name in editor_properties
+    )
+    if _source != [key]:
+        mel.eval(_mel_query_source(editor_capabilities))
+        _source[:] = [key]
+
+    camera = view.camera
+    result = mel.eval('mvpQueryState "%s"' % panel)
+    values = iter(result.split('\n'))
+
+    state = {'camera': camera}
+    for name in editor_properties:
+        capability = editor_capabilities[name]
+        if capability.mode == capabilities.UNSUPPORTED:
+            continue
+
+        value = next(values)
+        if value == QUERY_ERROR:
+            try:
+                state[name] = getattr(view, name)
+            except (RuntimeError, TypeError):
+                if capability.mode != capabilities.PLUGIN_OBJECT:
+                    raise
+                # The plugin providing this property is not loaded
+                capabilities.set_unsupported(name)
+            continue
+
+        value = _decode_query(value, EDITOR_PROPERTY_TYPES.get(name, 'bool'))
+        if capability.unwrap:
+            value = value[0]
+        state[name] = value
+
+    state.update(get_camera_state(camera))
+    return state
+
+
+# Panel names and wrapped widgets by widget address
+_panel_cache = {}
+_widget_cache = {}
+_panel_callbacks = {}
+
+
+def _wrap_instance(ptr, base, _wrap=[]):
+    '''Wrap a widget address as a Qt object.'''
 
-        locked = cmds.getAttr(attr, lock=True)
-        if locked:
+    if not _wrap:
+        try:
+            from shiboken import wrapInstance
+        except ImportError:  # PySide2 compat
+            from shiboken2 import wrapInstance
+        _wrap.append(wrapInstance)
+    return _wrap[0](ptr, base)
+
+
+def _watch_panel(panel, ptr):
+    '''Invalidate the cached panel name and widget of ptr when the panel
+    is deleted.'''
+
+    if panel in _panel_callbacks:
+        return
+
+    def on_panel_deleted(*args):
+        _forget_panel(panel, ptr)
+
+    try:
+        callback_id = OpenMayaUI.MUiMessage.addUiDeletedCallback(
+            panel,
+            on_panel_deleted,
+        )
+    except RuntimeError:
+        # Can not watch the panel so do not cache it
+        _panel_cache.pop(ptr, None)
+        _widget_cache.pop(ptr, None)
+        return
+
+    _panel_callbacks[panel] = callback_id
+
+
+def _forget_panel(panel, ptr):
+    '''Remove a panel from the caches and stop watching it.'''
+
+    registry.invalidate()
+    _panel_cache.pop(ptr, None)
+    _widget_cache.pop(ptr, None)
+    callback_id = _panel_callbacks.pop(panel, None)
+    if callback_id is not None:
+        OpenMaya.MMessage.removeCallback(callback_id)
+
+
+class ViewportRegistry(object):
+    '''Live registry of model panels mapping panel names to indices and
+    Viewports.
+
+    The registry is rebuilt lazily when a watched panel is deleted or the
+    number of 3d views changes. The active panel is tracked through the
+    ModelPanelSetFocus event so focus checks do not touch the M3dView api.
+    '''
+
+    def __init__(self):
+        self._views = []
+        self._indices = {}
+        self._active_panel = None
+        self._dirty = True
+        self._callback_ids = []
+
+    def _watch(self):
+        if self._callback_ids:
             return
 
-        has_connections = cmds.listConnections(attr, s=True, d=False)
-        if has_connections:
+        def on_focus_changed(*args):
+            self._active_panel = None
+
+        self._callback_ids.append(
+            OpenMaya.MEventMessage.addEventCallback(
+                'ModelPanelSetFocus',
+                on_focus_changed,
+            )
+        )
+
+    def sync(self):
+        '''Rebuild the registry if it is out of date.'''
+
+        self._watch()
+        count = OpenMayaUI.M3dView.numberOf3dViews()
+        if not self._dirty and count == len(self._views):
             return
 
+        self._views = []
+        self._indices = {}
+        for index in range(count):
+            m3dview = OpenMayaUI.M3dView()
+            OpenMayaUI.M3dView.get3dView(index, m3dview)
+            view = Viewport(m3dview)
+            self._views.append(view)
+            self._indices[view.panel] = index
+        self._dirty = False
+
+    def invalidate(self):
+        '''Force a rebuild on next access.'''
+
+        self._dirty = True
+        self._active_panel = None
+
+    def views(self):
+        '''List of all Viewports ordered by index.'''
+
+        self.sync()
+        return list(self._views)
+
+    def get(self, index):
+        '''Get the Viewport at index.'''
+
+        self.sync()
+        return self._views[index]
+
+    def index(self, panel):
+        '''Get the index of a panel.'''
+
+        self.sync()
         try:
-            if isinstance(value, (int, float)):
-                cmds.setAttr(attr, value)
-            elif isinstance(value, basestring):
-                cmds.setAttr(attr, value, type='string')
-            elif isinstance(value, (list, tuple)):
-                cmds.setAttr(attr, *value)
-            else:
-                cmds.setAttr(attr, value)
-        except Except as e:
-            print('Failed to set state: %s %s' % (attr, value))
-            print(e)
+            return self._indices[panel]
+        except KeyError:
+            raise IndexError('Can not find index')
+
+    def from_panel(self, panel):
+        '''Get the Viewport of a panel or None.'''
+
+        self.sync()
+        index = self._indices.get(panel)
+        if index is not None:
+            return self._views[index]
+
+    def active_panel(self):
+        '''Name of the active model panel.'''
+
+        if self._active_panel is None:
+            self._watch()
+            m3dview = OpenMayaUI.M3dView.active3dView()
+            self._active_panel = Viewport(m3dview).panel
+        return self._active_panel
+
+    def set_active_panel(self, panel):
+        '''Record a focus change made through Viewport.focus.'''
+
+        self._active_panel = panel
+
+
+registry = ViewportRegistry()
+
+
+class InstanceOrClassMethod(object):
+    '''Calls method when accessed through an instance and classmethod when
+    accessed through the class.'''
+
+    def __init__(self, method, classmethod):
+        self.method = method
+        self.classmethod = classmethod
+
+    def __get__(self, inst, typ=None):
+        if inst is None:
+            return self.classmethod.__get__(typ, typ)
+        return self.method.__get__(inst, typ)
 
 
 class Viewport(object):
@@ -293,19 +509,23 @@ class Viewport(object):
     for p in CAMERA_PROPERTIES:
         locals()[p] = CameraProperty(p)
 
+    __slots__ = ('_m3dview', '_ptr')
+
     def __init__(self, m3dview):
         self._m3dview = m3dview
-        self.highlight = self._highlight
-        self.identify = self._highlight
+        self._ptr = None
 
     def __hash__(self):
-        return hash(self._m3dview)
+        return hash(self.panel)
 
     def __eq__(self, other):
-        if hasattr(other, '_m3dview'):
-            return self._m3dview == other._m3dview
+        if isinstance(other, Viewport):
+            return self.panel == other.panel
         return self.panel == other
 
+    def __ne__(self, other):
+        return not self == other
+
     def copy(self):
         '''Tear off a copy of the viewport.
 
@@ -320,16 +540,16 @@ class Viewport(object):
     __deepcopy__ = copy
 
     def float(self):
-        '''Tear off the panel.'''
+        '''Tear off the panel. This panel is closed, use the returned
+        Viewport of the torn off panel instead.'''
         copied_view = self.copy()
         deferred_close(self)
-        self._m3dview = copied_view._m3dview
+        return copied_view
 
     @classmethod
     def new(cls):
         panel = cmds.modelPanel()
-        view = cls.from_panel(panel)
-        view.float()
+        view = cls.from_panel(panel).float()
         view.focus = True
         return view
 
@@ -346,26 +566,112 @@ class Viewport(object):
     def get_state(self):
         '''Get a state dictionary of all modelEditor properties.'''
 
-        active_state = {}
+        active_state = query_state(self)
         active_state['RenderGlobals'] = RenderGlobals.get_state()
-        for ep in EDITOR_PROPERTIES + CAMERA_PROPERTIES:
-            active_state[ep] = getattr(self, ep)
-
         return active_state
 
-    def set_state(self, state):
-        '''Sets a dictionary of properties all at once.
+    def diff_state(self, state, current=None):
+        '''Get the properties in state that differ from the current state.
+
+        When the camera changes all camera properties in state are included
+        because current only describes the previous camera.
+
+        :param state: Dictionary or ViewportState
+        :param current: State to diff against, defaults to get_state()'''
+
+        if current is None:
+            current = self.get_state()
+
+        state = ViewportState(state)
+        changes = ViewportState(current).diff(state)
+        if 'camera' in changes:
+            target = state.to_dict()
+            for k in CAMERA_PROPERTIES:
+                if k in target:
+                    changes[k] = target[k]
 
-        :param state: Dictionary including property, value pairs'''
+        return changes
 
-        cstate = state.copy()
+    @staticmethod
+    def select_state(state, changes):
+        '''Get the items of state for the properties in changes. Used to
+        collect the previous values of a set of changes.
+
+        :param state: Dictionary including property, value pairs
+        :param changes: Dictionary of changes like those from diff_state'''
+
+        selected = {}
+        for k in changes:
+            if k == 'RenderGlobals':
+                selected[k] = dict(
+                    (attr, value)
+                    for attr, value in state.get(k, {}).items()
+                    if attr in changes[k]
+                )
+            elif k in state:
+                selected[k] = state[k]
+        return selected
+
+    def set_state(self, state, diff=False, current=None):
+        '''Sets a dictionary of properties all at once. Editor properties
+        and RenderGlobals are set in a single MEL evaluation, see
+        :mod:`mvp.applier`. Unknown keys, like extra data stored in
+        presets, are ignored.
+
+        :param state: Dictionary or ViewportState
+        :param diff: Only set properties that differ from the current state
+        :param current: State to diff against, defaults to get_state()
+        :returns: Previous values of the properties that were set when diff
+            is True'''
+
+        if isinstance(state, ViewportState):
+            state = state.to_dict()
+
+        if diff:
+            if current is None:
+                current = self.get_state()
+            state = self.diff_state(state, current)
+
+        if state:
+            get_state_applier(state).apply(self)
+
+        if diff:
+            return self.select_state(current, state)
+
+    def get_camera_state(self):
+        '''Get a dict of all camera properties of the Viewport's camera.'''
+
+        return get_camera_state(self.camera)
+
+    def set_camera_state(self, state):
+        '''Set camera properties of the Viewport's camera all at once.
+
+        :param state: Dict containing property, value pairs'''
+
+        if defer_edit(self.set_camera_state, state):
+            return
+
+        get_camera_plugs(self.camera).set_state(state)
+
+    def apply_preset(self, name):
+        '''Apply a preset in a single MEL evaluation using its cached
+        PresetApplier, see :mod:`mvp.applier`.
+
+        :param name: Name of the preset'''
+
+        apply_preset(name, self)
+
+    @staticmethod
+    def batch():
+        '''Hold Viewport and RenderGlobals edits and apply them together
+        with a single refresh, see :func:`mvp.utils.batch_edits`::
 
-        renderglobals_state = cstate.pop('RenderGlobals', None)
-        if renderglobals_state:
-            RenderGlobals.set_state(renderglobals_state)
+            with Viewport.batch():
+                v.nurbsCurves = False
+                v.polymeshes = True
+        '''
 
-        for k, v in cstate.items():
-            setattr(self, k, v)
+        return batch_edits()
 
     def playblast(self, camera=None, state=None, **kwargs):
         '''Playblasting with reasonable default arguments. Automatically sets
@@ -381,6 +687,8 @@ class Viewport(object):
 
     @property
     def screen_geometry(self):
+        from Qt import QtWidgets
+
         qapp = QtWidgets.QApplication.instance()
         desktop = qapp.desktop()
         screen = desktop.screenNumber(self.widget)
@@ -405,16 +713,27 @@ class Viewport(object):
         h_offset = h2 - h1
         self.window.resize(wh[0] + w_offset, wh[1] + h_offset)
 
+    @property
+    def _address(self):
+        '''Returns the address of the viewports widget.'''
+
+        if self._ptr is None:
+            self._ptr = long(self._m3dview.widget())
+        return self._ptr
+
     @property
     def widget(self):
         '''Returns a QWidget object for the viewport.'''
 
-        try:
-            from shiboken import wrapInstance
-        except ImportError:  # PySide2 compat
-            from shiboken2 import wrapInstance
-        w = wrapInstance(long(self._m3dview.widget()), QtWidgets.QWidget)
-        return w
+        ptr = self._address
+        widget = _widget_cache.get(ptr)
+        if widget is None:
+            from Qt import QtWidgets
+
+            widget = _wrap_instance(ptr, QtWidgets.QWidget)
+            _widget_cache[ptr] = widget
+            _watch_panel(self.panel, ptr)
+        return widget
 
     @property
     def window(self):
@@ -425,24 +744,25 @@ class Viewport(object):
     @property
     def panel(self):
         '''Returns a panel name for the Viewport.'''
-        panel = OpenMayaUI.MQtUtil.fullName(long(self._m3dview.widget()))
-        return panel.split('|')[-2]
+
+        ptr = self._address
+        panel = _panel_cache.get(ptr)
+        if panel is None:
+            panel = OpenMayaUI.MQtUtil.fullName(ptr).split('|')[-2]
+            _panel_cache[ptr] = panel
+            _watch_panel(panel, ptr)
+        return panel
 
     @property
     def index(self):
         '''Returns the index of the viewport'''
 
-        i = 0
-        for i, view in Viewport.iter():
-            if self == view:
-                return i
-            i += 1
-        raise IndexError('Can not find index')
+        return registry.index(self.panel)
 
     @property
     def focus(self):
         '''Check if current Viewport is the active Viewport.'''
-        return self == self.active()
+        return self.panel == registry.active_panel()
 
     @focus.setter
     def focus(self, value):
@@ -456,6 +776,7 @@ class Viewport(object):
             return
 
         cmds.modelEditor(self.panel, edit=True, activeView=True)
+        registry.set_active_panel(self.panel)
 
     @property
     def camera(self):
@@ -470,6 +791,9 @@ class Viewport(object):
     def camera(self, camera_path):
         '''Set the active camera for the Viewport.'''
 
+        if defer_edit(setattr, self, 'camera', camera_path):
+            return
+
         sel = OpenMaya.MSelectionList()
         sel.add(camera_path)
         camera = OpenMaya.MDagPath()
@@ -503,11 +827,13 @@ class Viewport(object):
     def _highlight(self, msec=2000):
         '''Draws an identifier in a Viewport.'''
 
+        from .highlight import Highlight
+
         highlight = Highlight(self)
         highlight.display(msec)
 
     @classmethod
-    def identify(cls, delay=2000):
+    def _identify_all(cls, delay=2000):
         '''Shows identifiers in all Viewports::
 
             Viewport.identify()
@@ -518,7 +844,7 @@ class Viewport(object):
         cls.highlight()
 
     @classmethod
-    def highlight(cls, msec=2000):
+    def _highlight_all(cls, msec=2000):
         '''Draws QLabels indexing each Viewport. These indices can be used to
         with :method:`get` to return a corresponding Viewport object.'''
 
@@ -526,6 +852,9 @@ class Viewport(object):
             if viewport.widget.isVisible():
                 viewport.highlight(msec)
 
+    highlight = InstanceOrClassMethod(_highlight, _highlight_all)
+    identify = InstanceOrClassMethod(_highlight, _identify_all)
+
     @staticmethod
     def count():
         '''The number of 3D Viewports.'''
@@ -534,24 +863,29 @@ class Viewport(object):
 
     @classmethod
     def from_panel(cls, panel):
-        m3dview = OpenMayaUI.M3dView()
-        OpenMayaUI.M3dView.getM3dViewFromModelPanel(panel, m3dview)
-        return cls(m3dview)
+        '''Get the Viewport for a modelPanel.'''
+
+        view = registry.from_panel(panel)
+        if view is None:
+            m3dview = OpenMayaUI.M3dView()
+            OpenMayaUI.M3dView.getM3dViewFromModelPanel(panel, m3dview)
+            view = cls(m3dview)
+        return view
 
     @classmethod
     def get(cls, index):
         '''Get the Viewport at index.'''
 
-        m3dview = OpenMayaUI.M3dView()
-        OpenMayaUI.M3dView.get3dView(index, m3dview)
-        return cls(m3dview)
+        return registry.get(index)
 
     @classmethod
     def active(cls):
         '''Get the active Viewport.'''
 
-        m3dview = OpenMayaUI.M3dView.active3dView()
-        return cls(m3dview)
+        view = registry.from_panel(registry.active_panel())
+        if view is None:
+            view = cls(OpenMayaUI.M3dView.active3dView())
+        return view
 
     @classmethod
     def iter(cls):
@@ -563,54 +897,6 @@ class Viewport(object):
                 print(v.panel)
         '''
 
-        for index in range(cls.count()):
-            m3dview = OpenMayaUI.M3dView()
-            OpenMayaUI.M3dView.get3dView(index, m3dview)
-            yield cls(m3dview)
-
-
-class Highlight(QtWidgets.QDialog):
-    '''Outline a viewport panel and show the panel name.'''
-
-    def __init__(self, view):
-        super(Highlight, self).__init__(parent=get_maya_window())
-        self.view = view
-        self.widget = self.view.widget
-
-        self.setWindowFlags(
-            self.windowFlags()
-            | QtCore.Qt.FramelessWindowHint
-        )
-        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
-        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
-        wrect = self.widget.geometry()
-        rect = QtCore.QRect(
-            self.widget.mapToGlobal(
-                wrect.topLeft(),
-            ),
-            wrect.size(),
-        )
-        self.setGeometry(
-            rect
-        )
-
-    def display(self, msec):
-        w = QtWidgets.QApplication.instance().activeWindow()
-        self.show()
-        w.raise_()
-        QtCore.QTimer.singleShot(msec, self.accept)
-
-    def paintEvent(self, event):
-
-        painter = QtGui.QPainter(self)
-
-        pen = QtGui.QPen(QtCore.Qt.red)
-        pen.setWidth(8)
-        font = QtGui.QFont()
-        font.setPointSize(48)
-        painter.setFont(font)
-        painter.setPen(pen)
-        painter.setBrush(QtCore.Qt.transparent)
+        for view in registry.views():
+            yield view
 
-        painter.drawRect(self.rect())
-        painter.drawText(self.rect(), QtCore.Qt.AlignCenter, self.view.panel)
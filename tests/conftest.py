@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+'''
+Tests run in mayapy::
+
+    mayapy -m pytest tests
+
+Tests using maya are skipped when it is not available.
+'''
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def maya_standalone():
+    standalone = pytest.importorskip('maya.standalone')
+    standalone.initialize()
+    yield
+    standalone.uninitialize()
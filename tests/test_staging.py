@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import os
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip('maya.cmds')
+
+from mvp import config, fingerprint, incremental, staging, viewport
+from mvp.utils import frame_path
+
+
+pytestmark = pytest.mark.usefixtures('maya_standalone')
+
+
+@pytest.fixture
+def capture(monkeypatch, tmpdir):
+    '''Incremental capture of frames 1-5 without a viewport. Frames hold
+    their fingerprint, edit the fingerprints to change the scene.'''
+
+    monkeypatch.setattr(config, 'STAGING_PATH', str(tmpdir.join('staging')))
+
+    fingerprints = dict((frame, 'a%d' % frame) for frame in range(1, 6))
+    captured = []
+
+    def playblast(filename, startTime, endTime, framePadding, **kwargs):
+        for frame in range(startTime, endTime + 1):
+            captured.append(frame)
+            with open(frame_path(filename, frame, framePadding), 'w') as f:
+                f.write(fingerprints[frame])
+
+    @contextmanager
+    def viewport_state(view, state):
+        yield
+
+    monkeypatch.setattr(viewport, 'playblast', playblast)
+    monkeypatch.setattr(viewport.Viewport, 'active', staticmethod(dict))
+    monkeypatch.setattr(incremental, 'viewport_state', viewport_state)
+    monkeypatch.setattr(
+        fingerprint,
+        'capture_fingerprint',
+        lambda *args: 'base',
+    )
+    monkeypatch.setattr(
+        fingerprint,
+        'frame_fingerprints',
+        lambda camera, start, end, base, state: dict(fingerprints),
+    )
+
+    def capture(filename, stage=False):
+        del captured[:]
+        output = filename
+        if stage:
+            output = staging.get_staging_path(filename)
+        sequence = incremental.incremental_playblast(output, 1, 5, 'persp')
+        if stage:
+            sequence = staging.transfer(sequence, filename, 1, 5)
+        return sequence, list(captured)
+
+    capture.fingerprints = fingerprints
+    return capture
+
+
+def read_frames(prefix):
+    frames = {}
+    for frame in range(1, 6):
+        with open(frame_path(prefix, frame), 'r') as f:
+            frames[frame] = f.read()
+    return frames
+
+
+def test_staged_incremental_capture(capture, tmpdir):
+    filename = str(tmpdir.join('shot', 'shot'))
+
+    sequence, captured = capture(filename, stage=True)
+    assert sequence == filename + '.####.png'
+    assert captured == [1, 2, 3, 4, 5]
+    assert os.path.isfile(fingerprint.get_manifest_path(filename))
+    assert not os.listdir(config.STAGING_PATH)
+
+    # The transferred manifest matches the transferred frames
+    sequence, captured = capture(filename)
+    assert captured == []
+
+
+def test_staged_capture_replaces_manifest(capture, tmpdir):
+    filename = str(tmpdir.join('shot', 'shot'))
+    capture(filename)
+
+    capture.fingerprints[3] = 'b3'
+    capture(filename, stage=True)
+    assert read_frames(filename)[3] == 'b3'
+
+    # A stale manifest would reuse the staged frame here
+    capture.fingerprints[3] = 'a3'
+    sequence, captured = capture(filename)
+    assert captured == [3]
+    assert read_frames(filename) == capture.fingerprints
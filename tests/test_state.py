@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+from mvp.state import ViewportState, freeze, thaw
+
+
+STATE = {
+    'grid': False,
+    'lineWidth': 1.5,
+    'fogColor': [0.5, 0.5, 0.5, 1.0],
+    'RenderGlobals': {
+        'multiSampleEnable': True,
+        'ssaoAmount': 1.0,
+        'lineAAEnable': True,
+    },
+    'custom': {'b': [1, 2], 'a': {'nested': [3]}},
+}
+
+
+def test_freeze_thaw():
+    value = {'b': [1, {'c': [2]}], 'a': 1}
+    frozen = freeze(value)
+    assert frozen == freeze({'a': 1, 'b': [1, {'c': [2]}]})
+    assert hash(frozen) == hash(freeze(dict(value)))
+    assert thaw(frozen) == value
+    assert thaw(freeze([1, [2, 3]])) == [1, [2, 3]]
+
+
+def test_round_trip():
+    state = ViewportState(STATE)
+    assert state.to_dict() == STATE
+    assert ViewportState.from_json(state.to_json()) == state
+    assert pickle.loads(pickle.dumps(state)) == state
+
+
+def test_hash_with_dict_values():
+    a = ViewportState(STATE)
+    b = ViewportState(dict(STATE, custom={'a': {'nested': [3]}, 'b': [1, 2]}))
+    assert a == b
+    assert hash(a) == hash(b)
+    assert len(set([a, b])) == 1
+
+
+def test_diff():
+    state = ViewportState(STATE)
+    assert state.diff(STATE) == {}
+    assert state.diff(dict(STATE, lineWidth=1.5 + 1e-7)) == {}
+
+    other = dict(STATE, grid=True, custom={'a': 1})
+    other['RenderGlobals'] = dict(STATE['RenderGlobals'], ssaoAmount=2.0)
+    assert state.diff(other) == {
+        'grid': True,
+        'custom': {'a': 1},
+        'RenderGlobals': {'ssaoAmount': 2.0},
+    }
+
+
+def test_diff_ignores_unknown_render_globals():
+    state = ViewportState(STATE)
+    other = {'RenderGlobals': {'lineAAEnable': False, 'unknown': 1}}
+    assert state.diff(other) == {}
+    assert state.merge(other).to_dict()['RenderGlobals']['unknown'] == 1